@@ -1,10 +1,27 @@
 #!/usr/bin/env python3
-import gi
-import subprocess
 import sys
+import popup_client
+
+POPUP_NAME = "audio-selector"
+
+if __name__ == "__main__":
+    # Optional tab to open on: input or output (default)
+    if len(sys.argv) > 1 and sys.argv[1] not in ["input", "output"]:
+        print("Usage: audio-selector.py [input|output]")
+        sys.exit(1)
+
+    # Let a running popup daemon show the selector before paying for GTK startup
+    popup_client.handoff(POPUP_NAME)
+
+import gi
+import codecs
+import json
+import math
+import os
+import signal
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk, GLib
+from gi.repository import Gtk, Gdk, GLib, Gio
 
 try:
     gi.require_version("GtkLayerShell", "0.1")
@@ -13,81 +30,181 @@ try:
 except (ValueError, ImportError):
     HAS_LAYER_SHELL = False
 
-# Get device type from command line argument
-if len(sys.argv) < 2 or sys.argv[1] not in ["input", "output"]:
-    print("Usage: audio-selector.py [input|output]")
-    sys.exit(1)
+# The level meters need numpy; without it the popup works without them
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+import popup_common
+
+# Move already playing/recording streams along when the default changes
+MOVE_STREAMS = True
+MOVE_STREAMS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "move-streams.lua")
+
+device_type = "output"
+is_input = False
+devices = None  # Devices of the current type, None until the graph is known
+
+# PipeWire graph state, kept current by one long-running `pw-dump --monitor`
+AUDIO_CLASSES = {'Audio/Sink': False, 'Audio/Source': True}  # media.class -> is_input
+audio_nodes = {}  # node id -> pw-dump node object, sinks and sources only
+STREAM_CLASSES = {'Stream/Output/Audio': False, 'Stream/Input/Audio': True}  # media.class -> is_input
+stream_nodes = {}  # node id -> pw-dump node object, application streams
+default_nodes = {'sink': None, 'source': None}  # node.name of the default devices
+default_metadata_ids = set()
+graph_loaded = False
+graph_monitor = None
+
+# The graph is kept current while hidden, the list is only redrawn while shown
+popup_visible = False
+
+def apply_graph_update(objects):
+    """Fold one pw-dump update (a list of changed objects) into the graph state"""
+    global graph_loaded
+    graph_loaded = True
+
+    for obj in objects:
+        obj_id = obj.get('id')
+        obj_type = obj.get('type')
+        info = obj.get('info')
+
+        if obj_type is None and info is None:
+            # Object removed from the graph
+            audio_nodes.pop(obj_id, None)
+            stream_nodes.pop(obj_id, None)
+            default_metadata_ids.discard(obj_id)
+        elif obj_type == 'PipeWire:Interface:Node':
+            media_class = ((info or {}).get('props') or {}).get('media.class')
+            if media_class in AUDIO_CLASSES:
+                audio_nodes[obj_id] = obj
+            else:
+                audio_nodes.pop(obj_id, None)
+            if media_class in STREAM_CLASSES:
+                stream_nodes[obj_id] = obj
+            else:
+                stream_nodes.pop(obj_id, None)
+        elif obj_type == 'PipeWire:Interface:Metadata':
+            if (obj.get('props') or {}).get('metadata.name') == 'default':
+                default_metadata_ids.add(obj_id)
+            if obj_id not in default_metadata_ids:
+                continue
+            # Updates only carry the changed keys; a null value clears one
+            for entry in obj.get('metadata') or []:
+                value = entry.get('value')
+                name = value.get('name') if isinstance(value, dict) else None
+                if entry.get('key') == 'default.audio.sink':
+                    default_nodes['sink'] = name
+                elif entry.get('key') == 'default.audio.source':
+                    default_nodes['source'] = name
+
+def get_devices(is_input):
+    """Get audio sources (input) or sinks (output) from the graph state"""
+    if not graph_loaded:
+        return None
+
+    default_name = default_nodes['source' if is_input else 'sink']
+    devices = []
+    for node_id in sorted(audio_nodes):
+        props = audio_nodes[node_id]['info']['props']
+        if AUDIO_CLASSES[props['media.class']] != is_input:
+            continue
+        devices.append({
+            'id': str(node_id),
+            'name': props.get('node.description') or props.get('node.nick') or props.get('node.name', str(node_id)),
+            'is_default': props.get('node.name') == default_name
+        })
+    return devices
+
+def get_movable_streams(is_input):
+    """Ids of the application streams that follow a device of the given type"""
+    streams = []
+    for node_id in sorted(stream_nodes):
+        props = stream_nodes[node_id]['info']['props']
+        if STREAM_CLASSES[props['media.class']] != is_input:
+            continue
+        # Skip pinned streams (our own level meters) and sink monitor captures
+        if props.get('node.dont-move') or props.get('stream.capture.sink'):
+            continue
+        streams.append(node_id)
+    return streams
+
+def get_node_volume(node_id):
+    """Volume (wpctl's cubic scale) and mute state of a node, volume None if unknown"""
+    node = audio_nodes.get(int(node_id))
+    params = ((node or {}).get('info') or {}).get('params') or {}
+    for props in params.get('Props') or []:
+        if props.get('channelVolumes'):
+            return max(props['channelVolumes']) ** (1 / 3), bool(props.get('mute'))
+    return None, False
+
+def refresh_devices():
+    """Re-render the list if the devices of the current type changed"""
+    global devices
+    new_devices = get_devices(is_input)
+    if new_devices != devices:
+        devices = new_devices
+        populate_list()
+    else:
+        update_volume_controls()
 
-device_type = sys.argv[1]
-is_input = device_type == "input"
+def start_graph_monitor():
+    """Watch the PipeWire graph so the device list follows hotplug without re-polling"""
+    global graph_monitor
+    if graph_monitor is not None:
+        return
 
-# Get audio devices from wpctl
-try:
-    wpctl_output = subprocess.check_output(["wpctl", "status"], text=True)
-except Exception as e:
-    print(f"Error: Could not get audio devices: {e}")
-    sys.exit(1)
-
-# Parse wpctl output to get devices
-devices = []
-in_audio = False
-in_section = False
-current_default = None
-
-for line in wpctl_output.split('\n'):
-    # Track Audio section
-    if line.strip().startswith('Audio'):
-        in_audio = True
-        continue
-    elif line.strip().startswith('Video'):
-        in_audio = False
-        continue
-
-    if not in_audio:
-        continue
-
-    # Track Sinks/Sources section
-    if is_input and 'Sources:' in line:
-        in_section = True
-        continue
-    elif is_input and 'Filters:' in line:
-        in_section = False
-        continue
-    elif not is_input and 'Sinks:' in line:
-        in_section = True
-        continue
-    elif not is_input and 'Sources:' in line:
-        in_section = False
-        continue
-
-    if not in_section:
-        continue
-
-    # Parse device lines
-    line_stripped = line.replace('├', '').replace('─', '').replace('│', '').replace('└', '').strip()
-    # Check for asterisk (default device marker)
-    is_default = '*' in line_stripped
-    # Remove asterisk and whitespace
-    line_clean = line_stripped.replace('*', '').strip()
-
-    # Check if this is a device line (starts with digit after cleanup)
-    if line_clean and line_clean[0].isdigit():
-        # Extract ID and name
-        parts = line_clean.split('.', 1)
-        if len(parts) == 2:
-            device_id = parts[0].strip()
-            device_name = parts[1].split('[')[0].strip()
-            devices.append({
-                'id': device_id,
-                'name': device_name,
-                'is_default': is_default
-            })
-            if is_default:
-                current_default = device_id
+    try:
+        graph_monitor = Gio.Subprocess.new(
+            ['pw-dump', '--monitor', '--no-colors'],
+            Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_SILENCE
+        )
+    except GLib.Error as e:
+        print(f"Error: Could not watch audio devices: {e.message}")
+        return
+
+    monitor = graph_monitor
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = []
+
+    def on_read(stream, result):
+        global graph_monitor
+        try:
+            data = stream.read_bytes_finish(result).get_data()
+        except GLib.Error:
+            data = b""
+        if not data:
+            # pw-dump exited (e.g. PipeWire restarted), start over on next present
+            if graph_monitor is monitor:
+                graph_monitor = None
+            return
+
+        # Every update is a top-level JSON array whose closing bracket starts a line
+        pending.append(decoder.decode(data))
+        buffer = ''.join(pending)
+        pending.clear()
+        updated = False
+        end = buffer.find('\n]')
+        while end >= 0:
+            try:
+                apply_graph_update(json.loads(buffer[:end + 2]))
+                updated = True
+            except ValueError as e:
+                print(f"Error: Bad pw-dump update: {e}")
+            buffer = buffer[end + 2:]
+            end = buffer.find('\n]')
+        pending.append(buffer)
+
+        if updated and popup_visible:
+            refresh_devices()
+        stream.read_bytes_async(65536, GLib.PRIORITY_DEFAULT, None, on_read)
+
+    monitor.get_stdout_pipe().read_bytes_async(65536, GLib.PRIORITY_DEFAULT, None, on_read)
 
 # Create window
 win = Gtk.Window()
-win.set_title(f"Select {'Input' if is_input else 'Output'} Device")
+win.set_title("Select Audio Device")
 win.set_decorated(False)
 win.set_resizable(False)
 win.set_type_hint(Gdk.WindowTypeHint.DIALOG)
@@ -106,20 +223,47 @@ if HAS_LAYER_SHELL:
 # Create content box
 main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
 
-# Header with close button
+# Header with input/output tabs and close button
 header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
 header_box.set_border_width(15)
-header = Gtk.Label()
-header.set_xalign(0)
-icon = "" if is_input else "󰓃"
-header.set_markup(f"<b>{icon} {'Input' if is_input else 'Output'} Devices</b>")
-header.set_hexpand(True)
+tabs_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
+tabs_box.set_hexpand(True)
+tabs_box.get_style_context().add_class("tabs")
+
+def show_tab(new_type):
+    """Show one device type; both come from the same graph state, so this is instant"""
+    global device_type, is_input, devices
+    device_type = new_type
+    is_input = device_type == "input"
+    popup_common.set_args(POPUP_NAME, [device_type])
+    devices = get_devices(is_input)
+    populate_list()
+
+def on_tab_toggled(button, tab_type):
+    if button.get_active() and tab_type != device_type:
+        popup_common.keep_open(POPUP_NAME)
+        show_tab(tab_type)
+
+tab_buttons = {}
+for tab_type, icon, label in [("input", "", "Input"), ("output", "󰓃", "Output")]:
+    tab_button = Gtk.RadioButton.new_with_label_from_widget(
+        next(iter(tab_buttons.values()), None), f"{icon}  {label}"
+    )
+    tab_button.set_mode(False)  # Draw as a toggle button, not a radio
+    tab_button.get_style_context().add_class("tab-button")
+    tab_button.connect("toggled", on_tab_toggled, tab_type)
+    tabs_box.pack_start(tab_button, True, True, 0)
+    tab_buttons[tab_type] = tab_button
+
+def close_popup(*_):
+    """Close the selector (hidden when hosted by the popup daemon)"""
+    return popup_common.close(POPUP_NAME)
 
 close_button = Gtk.Button(label="✕")
-close_button.connect("clicked", lambda *_: Gtk.main_quit())
+close_button.connect("clicked", close_popup)
 close_button.get_style_context().add_class("close-button")
 
-header_box.pack_start(header, True, True, 0)
+header_box.pack_start(tabs_box, True, True, 0)
 header_box.pack_start(close_button, False, False, 0)
 
 main_box.pack_start(header_box, False, False, 0)
@@ -134,107 +278,414 @@ list_box.set_selection_mode(Gtk.SelectionMode.NONE)
 list_box.set_activate_on_single_click(True)  # Enable single-click activation
 list_box.get_style_context().add_class("device-list")
 
+def show_default(device_id, is_default):
+    """Update one row's checkmark and weight"""
+    device = devices_by_id.get(device_id)
+    if device is None:
+        return
+    device['is_default'] = is_default
+    if is_default:
+        default_ids[is_input] = device_id
+    elif default_ids[is_input] == device_id:
+        default_ids[is_input] = None
+
+    check_label, name_label, _, _, _ = device_rows[device_id]
+    check_label.set_text("✓" if is_default else " ")
+    if is_default:
+        name_label.set_markup(f"<b>{GLib.markup_escape_text(device['name'])}</b>")
+    else:
+        name_label.set_text(device['name'])
+
 def set_device(device_id):
-    """Set the audio device as default"""
-    try:
-        subprocess.run(["wpctl", "set-default", device_id], check=True)
-        # Give wpctl a moment to update
-        import time
-        time.sleep(0.1)
-
-        # Find device name from our devices list
-        selected_device_name = None
-        for device in devices:
-            if device['id'] == device_id:
-                selected_device_name = device['name']
-                break
-
-        # Update UI to show the new selection
-        for row in list_box.get_children():
-            box = row.get_child()
-            check_label = box.get_children()[0]
-            name_label = box.get_children()[1]
-
-            if row in device_map and device_map[row] == device_id:
-                # This is the newly selected device
-                check_label.set_text("✓")
-                name_label.set_markup(f"<b>{devices[[d['id'] for d in devices].index(device_id)]['name']}</b>")
-            else:
-                # Other devices
-                check_label.set_text(" ")
-                # Get device name for this row and reset without bold
-                row_device_id = device_map.get(row)
-                if row_device_id:
-                    for d in devices:
-                        if d['id'] == row_device_id:
-                            name_label.set_text(d['name'])
-                            break
-
-        # Send notification for device switch
-        if selected_device_name:
-            notify_icon = "audio-input-microphone" if is_input else "audio-speakers"
-            notify_type = "Input" if is_input else "Output"
-            replace_id = "9010" if is_input else "9011"
-            subprocess.run([
+    """Set the audio device as default without blocking the UI"""
+    device = devices_by_id.get(device_id)
+    if device is None or device['is_default']:
+        return
+    previous_id = default_ids[is_input]
+    device_is_input = is_input  # The tab may change before the switch completes
+
+    # Show the switch right away; only the two affected rows change
+    if previous_id is not None:
+        show_default(previous_id, False)
+    show_default(device_id, True)
+    started = GLib.get_monotonic_time()
+
+    def notify_switched(body=None):
+        notify_icon = "audio-input-microphone" if device_is_input else "audio-speakers"
+        notify_type = "Input" if device_is_input else "Output"
+        replace_id = "9010" if device_is_input else "9011"
+        popup_common.spawn([
+            'notify-send',
+            '-u', 'low',
+            '-a', 'Audio',
+            '-c', 'device',
+            '-i', notify_icon,
+            '-t', '2000',
+            '-r', replace_id,
+            f"{notify_type}: {device['name']}"
+        ] + ([body] if body else []))
+
+    def on_switched(output):
+        if output is None:
+            # Roll back unless the selection moved on meanwhile
+            if device['is_default']:
+                show_default(device_id, False)
+                if previous_id is not None:
+                    show_default(previous_id, True)
+            print(f"Error setting device: {device['name']}")
+            popup_common.spawn([
                 'notify-send',
-                '-u', 'low',
+                '-u', 'critical',
                 '-a', 'Audio',
-                '-c', 'device',
-                '-i', notify_icon,
-                '-t', '2000',
-                '-r', replace_id,
-                f'{notify_type}: {selected_device_name}'
+                '-c', 'device.error',
+                '-i', 'dialog-error',
+                '-t', '3000',
+                '-r', '9012',
+                'Audio Error',
+                f"Could not switch to {device['name']}"
             ])
+            return
+
+        node = audio_nodes.get(int(device_id))
+        streams = get_movable_streams(device_is_input) if move_streams_check.get_active() else []
+        if node is None or not streams:
+            notify_switched()
+            return
+
+        # Re-target every stream from a single WirePlumber client
+        props = node['info']['props']
+        target = props.get('object.serial') or props.get('node.name')
+        request = json.dumps({'target': str(target), 'streams': ','.join(map(str, streams))})
+
+        def on_moved(output):
+            elapsed_ms = (GLib.get_monotonic_time() - started) // 1000
+            if output is None:
+                notify_switched(f"Could not move streams ({elapsed_ms} ms)")
+                return
+            lines = output.split()
+            moved = int(lines[-1]) if lines and lines[-1].isdigit() else len(streams)
+            notify_switched(f"Moved {moved} stream{'s' if moved != 1 else ''} in {elapsed_ms} ms")
+
+        popup_common.run_command(["wpexec", MOVE_STREAMS_SCRIPT, request], on_moved)
+
+    # Window will close based on hover behavior (stays open while mouse is inside)
+    popup_common.run_command(["wpctl", "set-default", device_id], on_switched)
+
+# Volume writes: slider drags are coalesced to at most one wpctl call per
+# frame and per device, with never more than one call in flight
+FRAME_INTERVAL_MS = 16
+volume_writes = {}  # device id -> {'pending': volume or None, 'busy': bool}
+updating_controls = False  # Set while controls follow the graph, not the user
+
+def flush_volume_write(device_id):
+    write = volume_writes[device_id]
+    volume = write['pending']
+    write['pending'] = None
+
+    def on_written(output):
+        if output is None:
+            print(f"Error setting volume of {device_id}")
+        if write['pending'] is None:
+            write['busy'] = False
+        else:
+            # The slider moved meanwhile; write its latest value on the next frame
+            GLib.timeout_add(FRAME_INTERVAL_MS, flush_volume_write, device_id)
+
+    popup_common.run_command(["wpctl", "set-volume", device_id, f"{volume:.3f}"], on_written)
+    return False
 
-        # Window will close based on hover behavior (stays open while mouse is inside)
-    except Exception as e:
-        print(f"Error setting device: {e}")
-        subprocess.run([
-            'notify-send',
-            '-u', 'critical',
-            '-a', 'Audio',
-            '-c', 'device.error',
-            '-i', 'dialog-error',
-            '-t', '3000',
-            '-r', '9012',
-            'Audio Error',
-            str(e)
-        ])
-
-# Store device mapping for row activation
+def queue_volume_write(device_id, volume):
+    write = volume_writes.setdefault(device_id, {'pending': None, 'busy': False})
+    write['pending'] = volume
+    if not write['busy']:
+        write['busy'] = True
+        GLib.timeout_add(FRAME_INTERVAL_MS, flush_volume_write, device_id)
+
+def on_volume_changed(scale, device_id):
+    if not updating_controls:
+        queue_volume_write(device_id, scale.get_value())
+    _, _, _, percent_label, _ = device_rows[device_id]
+    percent_label.set_text(f"{round(scale.get_value() * 100)}%")
+
+def on_mute_toggled(button, device_id):
+    button.set_label(mute_icon(button.get_active()))
+    if not updating_controls:
+        popup_common.run_command(["wpctl", "set-mute", device_id, "1" if button.get_active() else "0"], lambda output: None)
+
+def mute_icon(muted):
+    if is_input:
+        return "" if muted else ""
+    return "󰝟" if muted else ""
+
+def update_volume_controls():
+    """Make the sliders and mute buttons follow the graph"""
+    global updating_controls
+    updating_controls = True
+    for device_id, (_, _, scale, _, mute_button) in device_rows.items():
+        volume, muted = get_node_volume(device_id)
+        scale.set_sensitive(volume is not None)
+        # Leave a slider alone while the user's own writes are still going out
+        if volume is not None and not volume_writes.get(device_id, {}).get('busy'):
+            scale.set_value(volume)
+        mute_button.set_active(muted)
+    updating_controls = False
+
+# Level meters: while the popup is shown every listed device is captured at
+# a low rate by one pw-record with a channel per device (sinks through their
+# monitor ports), linked up by link-meters.lua. Each block is split into
+# per-device peak/RMS in one vectorized pass, and the bars are redrawn once
+# per display frame
+METER_RATE = 8000
+METER_RANGE_DB = 60
+METER_DECAY_PER_SEC = 1.5
+METER_NODE_NAME = f"waybar-level-meter-{os.getpid()}"
+LINK_METERS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "link-meters.lua")
+meters_active = False
+meter_capture = None  # {'proc', 'devices': device ids in channel order, 'peak', 'rms'} arrays
+meter_shown = {}  # device id -> level currently drawn
+device_meters = {}  # device id -> level bar
+meter_tick_id = None
+meter_last_frame = 0
+
+def block_levels(data, channels):
+    """Per-channel peak and RMS of a block of interleaved f32 samples"""
+    frames = np.frombuffer(data, dtype=np.float32).reshape(-1, channels)
+    if not len(frames):
+        return np.zeros(channels), np.zeros(channels)
+    return np.abs(frames).max(axis=0), np.sqrt(np.mean(np.square(frames), axis=0))
+
+def level_fraction(amplitude):
+    """Map an amplitude to 0..1 on a dB scale"""
+    if amplitude <= 0:
+        return 0.0
+    return max(0.0, 1 + 20 * math.log10(amplitude) / METER_RANGE_DB)
+
+def start_capture(device_ids):
+    """Capture all of device_ids from a single stream, one channel each"""
+    global meter_capture
+    channels = len(device_ids)
+    try:
+        # --target 0: not linked by the session manager, link-meters.lua does it
+        proc = Gio.Subprocess.new(
+            ['pw-record', '--raw', '--target', '0',
+             '--rate', str(METER_RATE), '--channels', str(channels),
+             '--channel-map', ','.join(f"AUX{i}" for i in range(channels)),
+             '--format', 'f32', '--latency', '30ms',
+             '-P', f"{{ node.name={METER_NODE_NAME} node.dont-move=true }}", '-'],
+            Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_SILENCE
+        )
+    except GLib.Error as e:
+        print(f"Error: Could not start level meters: {e.message}")
+        return
+
+    capture = {
+        'proc': proc,
+        'devices': device_ids,
+        'peak': np.zeros(channels),
+        'rms': np.zeros(channels),
+    }
+    meter_capture = capture
+    frame_bytes = 4 * channels
+    rest = b""
+
+    # The listed devices are all of one type; sink monitors are linked
+    # passively so idle sinks can still suspend
+    request = json.dumps({
+        'meter': METER_NODE_NAME,
+        'devices': ','.join(device_ids),
+        'passive': not is_input,
+    })
+
+    def on_linked(output):
+        if output is None:
+            print("Error: Could not link the level meters")
+
+    popup_common.run_command(["wpexec", LINK_METERS_SCRIPT, request], on_linked)
+
+    def on_read(stream, result):
+        nonlocal rest
+        try:
+            data = stream.read_bytes_finish(result).get_data()
+        except GLib.Error:
+            data = b""
+        if not data or meter_capture is not capture:
+            return
+
+        # Keep whole frames only; a partial one waits for the next block
+        data = rest + data
+        whole = len(data) - len(data) % frame_bytes
+        rest = data[whole:]
+        peak, rms = block_levels(data[:whole], channels)
+        np.maximum(capture['peak'], peak, out=capture['peak'])
+        np.maximum(capture['rms'], rms, out=capture['rms'])
+        stream.read_bytes_async(4096, GLib.PRIORITY_LOW, None, on_read)
+
+    proc.get_stdout_pipe().read_bytes_async(4096, GLib.PRIORITY_LOW, None, on_read)
+
+def stop_capture():
+    global meter_capture
+    if meter_capture is not None:
+        meter_capture['proc'].send_signal(signal.SIGTERM)
+        meter_capture = None
+
+def on_meter_tick(widget, frame_clock):
+    """Push the levels gathered since the last frame to the bars"""
+    global meter_last_frame
+    now = frame_clock.get_frame_time()
+    elapsed = (now - meter_last_frame) / 1e6 if meter_last_frame else 0
+    meter_last_frame = now
+
+    capture = meter_capture
+    if capture is None:
+        return GLib.SOURCE_CONTINUE
+    for channel, device_id in enumerate(capture['devices']):
+        level_bar = device_meters.get(device_id)
+        if level_bar is None:
+            continue
+        level = level_fraction(float(capture['rms'][channel]))
+        shown = max(level, meter_shown.get(device_id, 0.0) - METER_DECAY_PER_SEC * elapsed)
+        if shown != meter_shown.get(device_id):
+            meter_shown[device_id] = shown
+            level_bar.set_value(shown)
+        context = level_bar.get_style_context()
+        if capture['peak'][channel] >= 0.99:
+            context.add_class("clipping")
+        else:
+            context.remove_class("clipping")
+    capture['peak'].fill(0)
+    capture['rms'].fill(0)
+    return GLib.SOURCE_CONTINUE
+
+def sync_meters():
+    """Capture exactly the devices currently listed"""
+    global meter_tick_id, meter_last_frame
+    if not meters_active or not HAS_NUMPY:
+        return
+    device_ids = list(device_meters)
+    if meter_capture is None or meter_capture['devices'] != device_ids:
+        stop_capture()
+        meter_shown.clear()
+        if device_ids:
+            start_capture(device_ids)
+    if meter_tick_id is None:
+        meter_last_frame = 0
+        meter_tick_id = list_box.add_tick_callback(on_meter_tick)
+
+def stop_meters():
+    """Stop the capture so a hidden popup costs nothing"""
+    global meters_active, meter_tick_id
+    meters_active = False
+    stop_capture()
+    if meter_tick_id is not None:
+        list_box.remove_tick_callback(meter_tick_id)
+        meter_tick_id = None
+
+# Store device mapping for row activation, plus id-indexed lookups
 device_map = {}
-
-# Add devices to list
-for device in devices:
-    row = Gtk.ListBoxRow()
-    row.set_activatable(True)  # Make row clickable
-    row.get_style_context().add_class("device-row")
-
-    box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-    box.set_border_width(10)
-
-    # Checkmark for current device
-    check_label = Gtk.Label(label="✓" if device['is_default'] else " ")
-    check_label.set_width_chars(2)
-    check_label.get_style_context().add_class("check-label")
-
-    # Device name - bold if it's the default device
-    name_label = Gtk.Label()
-    name_label.set_xalign(0)
-    name_label.set_hexpand(True)
-    if device['is_default']:
-        name_label.set_markup(f"<b>{device['name']}</b>")
-    else:
-        name_label.set_text(device['name'])
-
-    box.pack_start(check_label, False, False, 0)
-    box.pack_start(name_label, True, True, 0)
-
-    row.add(box)
-    list_box.add(row)
-
-    # Store device ID for this row
-    device_map[row] = device['id']
+devices_by_id = {}  # device id -> device
+default_ids = {False: None, True: None}  # is_input -> id of the listed default device
+device_rows = {}  # device id -> (check label, name label, volume scale, percent label, mute button)
+
+def populate_list():
+    """Fill the device list for the current device type"""
+    for row in list_box.get_children():
+        list_box.remove(row)
+    device_map.clear()
+    devices_by_id.clear()
+    default_ids[is_input] = None
+    device_rows.clear()
+    device_meters.clear()
+
+    if devices is None:
+        loading_row = Gtk.ListBoxRow()
+        loading_row.set_activatable(False)
+        loading_label = Gtk.Label(label="Loading devices...")
+        loading_label.set_border_width(10)
+        loading_row.add(loading_label)
+        list_box.add(loading_row)
+        list_box.show_all()
+        return
+
+    # Add devices to list
+    for device in devices:
+        row = Gtk.ListBoxRow()
+        row.set_activatable(True)  # Make row clickable
+        row.get_style_context().add_class("device-row")
+
+        row_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        row_box.set_border_width(10)
+
+        box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+
+        # Checkmark for current device
+        check_label = Gtk.Label(label="✓" if device['is_default'] else " ")
+        check_label.set_width_chars(2)
+        check_label.get_style_context().add_class("check-label")
+
+        # Device name - bold if it's the default device
+        name_label = Gtk.Label()
+        name_label.set_xalign(0)
+        name_label.set_hexpand(True)
+        if device['is_default']:
+            name_label.set_markup(f"<b>{GLib.markup_escape_text(device['name'])}</b>")
+        else:
+            name_label.set_text(device['name'])
+
+        box.pack_start(check_label, False, False, 0)
+        box.pack_start(name_label, True, True, 0)
+
+        # Inline mute toggle and volume slider
+        controls_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        volume, muted = get_node_volume(device['id'])
+
+        mute_button = Gtk.ToggleButton(label=mute_icon(muted))
+        mute_button.set_active(muted)
+        mute_button.get_style_context().add_class("mute-button")
+        mute_button.connect("toggled", on_mute_toggled, device['id'])
+
+        scale = Gtk.Scale.new_with_range(Gtk.Orientation.HORIZONTAL, 0, 1.5, 0.01)
+        scale.set_draw_value(False)
+        scale.add_mark(1.0, Gtk.PositionType.BOTTOM, None)
+        scale.set_hexpand(True)
+        scale.set_value(volume or 0)
+        scale.set_sensitive(volume is not None)
+        scale.get_style_context().add_class("volume-scale")
+
+        percent_label = Gtk.Label(label=f"{round((volume or 0) * 100)}%")
+        percent_label.set_width_chars(5)
+        percent_label.set_xalign(1)
+        percent_label.get_style_context().add_class("volume-label")
+
+        controls_box.pack_start(mute_button, False, False, 0)
+        controls_box.pack_start(scale, True, True, 0)
+        controls_box.pack_start(percent_label, False, False, 0)
+
+        row_box.pack_start(box, False, False, 0)
+        row_box.pack_start(controls_box, False, False, 0)
+
+        # Live input/output level
+        if HAS_NUMPY:
+            level_bar = Gtk.LevelBar()
+            level_bar.set_mode(Gtk.LevelBarMode.CONTINUOUS)
+            level_bar.set_min_value(0)
+            level_bar.set_max_value(1)
+            level_bar.get_style_context().add_class("level-meter")
+            row_box.pack_start(level_bar, False, False, 0)
+            device_meters[device['id']] = level_bar
+
+        row.add(row_box)
+        list_box.add(row)
+
+        # Store device ID for this row
+        device_map[row] = device['id']
+        devices_by_id[device['id']] = device
+        if device['is_default']:
+            default_ids[is_input] = device['id']
+        device_rows[device['id']] = (check_label, name_label, scale, percent_label, mute_button)
+        scale.connect("value-changed", on_volume_changed, device['id'])
+
+    list_box.show_all()
+    sync_meters()
 
 # Connect to row-activated signal on the ListBox
 def on_row_activated(listbox, row):
@@ -257,9 +708,14 @@ footer_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
 footer_box.set_border_width(10)
 
 settings_btn = Gtk.Button(label="⚙️  Settings")
-settings_btn.connect("clicked", lambda *_: (subprocess.Popen(["pavucontrol"]), Gtk.main_quit()))
+settings_btn.connect("clicked", lambda *_: (popup_common.spawn(["pavucontrol"]), close_popup()))
 settings_btn.get_style_context().add_class("footer-button")
 
+move_streams_check = Gtk.CheckButton(label="Move playing streams")
+move_streams_check.set_active(MOVE_STREAMS)
+move_streams_check.get_style_context().add_class("move-streams-check")
+
+footer_box.pack_start(move_streams_check, False, False, 0)
 footer_box.pack_end(settings_btn, False, False, 0)
 
 main_box.pack_start(footer_box, False, False, 0)
@@ -267,8 +723,7 @@ main_box.pack_start(footer_box, False, False, 0)
 win.add(main_box)
 
 # Style the window
-css_provider = Gtk.CssProvider()
-css_provider.load_from_data(b"""
+popup_common.load_css(win, POPUP_NAME, b"""
 window {
     background-color: rgba(30, 30, 46, 0.95);
     border: 2px solid rgba(137, 180, 250, 0.8);
@@ -289,6 +744,63 @@ window {
 .device-row:active {
     background-color: rgba(137, 180, 250, 0.4);
 }
+.mute-button {
+    background-color: transparent;
+    border: none;
+    color: #89b4fa;
+    min-width: 24px;
+    padding: 2px 4px;
+}
+.mute-button:checked {
+    color: #f38ba8;
+}
+.volume-scale trough {
+    min-height: 4px;
+    background-color: rgba(137, 180, 250, 0.2);
+}
+.volume-scale highlight {
+    background-color: #89b4fa;
+}
+.volume-label {
+    color: #a6adc8;
+}
+.level-meter trough {
+    min-height: 3px;
+    background-color: rgba(137, 180, 250, 0.1);
+    border: none;
+}
+.level-meter block.filled {
+    background-color: #a6e3a1;
+    border: none;
+}
+.level-meter.clipping block.filled {
+    background-color: #f38ba8;
+}
+.level-meter block.empty {
+    background-color: transparent;
+    border: none;
+}
+.move-streams-check label {
+    color: #a6adc8;
+}
+.tab-button {
+    background-color: transparent;
+    border: 1px solid rgba(137, 180, 250, 0.3);
+    border-radius: 0;
+    color: #a6adc8;
+    padding: 6px 12px;
+}
+.tab-button:first-child {
+    border-radius: 4px 0 0 4px;
+}
+.tab-button:last-child {
+    border-radius: 0 4px 4px 0;
+}
+.tab-button:checked {
+    background-color: rgba(137, 180, 250, 0.3);
+    color: #89b4fa;
+    font-weight: bold;
+}
 .check-label {
     color: #a6e3a1;
     font-weight: bold;
@@ -323,65 +835,29 @@ separator {
     min-height: 1px;
 }
 """)
-Gtk.StyleContext.add_provider_for_screen(
-    Gdk.Screen.get_default(),
-    css_provider,
-    Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-)
-
-win.show_all()
 
 # Close on Escape key
-win.connect("key-press-event", lambda w, e: Gtk.main_quit() if e.keyval == Gdk.KEY_Escape else None)
-
-# Auto-close after 30 seconds of inactivity
-GLib.timeout_add_seconds(30, Gtk.main_quit)
-
-# Smart click-away-to-close with hover delay
-mouse_entered = False
-close_timeout_id = None
-
-def schedule_close():
-    """Actually close the window if mouse is still outside"""
-    global mouse_entered
-    if not mouse_entered:
-        Gtk.main_quit()
-    return False  # Don't repeat the timeout
-
-def on_enter_notify(widget, event):
-    global mouse_entered, close_timeout_id
-    # Only track actual window entry, not child widget crossings
-    if event.detail != Gdk.NotifyType.INFERIOR:
-        mouse_entered = True
-        # Cancel any pending close timeout
-        if close_timeout_id is not None:
-            GLib.source_remove(close_timeout_id)
-            close_timeout_id = None
-    return False
-
-def on_leave_notify(widget, event):
-    global mouse_entered, close_timeout_id
-    # Only track actual window exit, not child widget crossings
-    if event.detail != Gdk.NotifyType.INFERIOR:
-        mouse_entered = False
-        # Schedule close after 1 second of mouse being outside
-        if close_timeout_id is not None:
-            GLib.source_remove(close_timeout_id)
-        close_timeout_id = GLib.timeout_add(1000, schedule_close)
-    return False
-
-def on_focus_out(widget, event):
-    global mouse_entered, close_timeout_id
-    # If focus is lost and mouse never entered, close after short delay
-    # This handles clicking outside the window
-    if not mouse_entered:
-        if close_timeout_id is not None:
-            GLib.source_remove(close_timeout_id)
-        close_timeout_id = GLib.timeout_add(200, schedule_close)
-    return False
-
-win.connect("enter-notify-event", on_enter_notify)
-win.connect("leave-notify-event", on_leave_notify)
-win.connect("focus-out-event", on_focus_out)
-
-Gtk.main()
+win.connect("key-press-event", lambda w, e: close_popup() if e.keyval == Gdk.KEY_Escape else None)
+
+def on_present(args):
+    global device_type, meters_active, popup_visible
+    tab_type = args[0] if args and args[0] in ["input", "output"] else "output"
+
+    # The list comes straight from the watched graph; before pw-dump's first
+    # dump arrives it shows a placeholder and fills in live
+    start_graph_monitor()
+    popup_visible = True
+    meters_active = True
+    device_type = tab_type  # Keeps the toggled handler from rendering twice
+    tab_buttons[tab_type].set_active(True)
+    show_tab(tab_type)
+
+def on_hide():
+    global popup_visible
+    popup_visible = False
+    stop_meters()
+
+start_graph_monitor()
+
+# Stays open while the pointer is inside; focus loss only closes if it never entered
+popup_common.run(POPUP_NAME, win, on_present, on_hide=on_hide, close_on_focus_out=False)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# Scaled app icon cache for the waybar popups.
+# Icons are decoded, scaled and written back as thumbnails to
+# ~/.cache/waybar/icons on GIO's worker threads, and kept in a small
+# in-memory LRU, so a reopened popup neither re-reads nor re-decodes the
+# full-size PNGs. Once writes settle, the on-disk cache is trimmed to
+# MAX_DISK_BYTES, oldest thumbnails first, on a worker thread of its own.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import gi
+
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import GdkPixbuf, GLib, Gio
+
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "waybar", "icons"
+)
+MAX_MEMORY_ICONS = 256
+MAX_DISK_BYTES = 4 * 1024 * 1024
+TRIM_DELAY_S = 5
+
+_memory = OrderedDict()  # (path, size, mtime) -> pixbuf
+_pending = {}  # (path, size, mtime) -> callbacks waiting on the same decode
+_trim_source_id = None
+_trim_lock = threading.Lock()  # Held by the running trim
+_cache_dir_ready = False
+
+def _thumbnail_path(path, size):
+    digest = hashlib.sha1(path.encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}-{size}.png")
+
+def _remember(key, pixbuf):
+    _memory[key] = pixbuf
+    _memory.move_to_end(key)
+    while len(_memory) > MAX_MEMORY_ICONS:
+        _memory.popitem(last=False)
+
+def _trim_disk_cache():
+    """Drop the least recently written thumbnails beyond MAX_DISK_BYTES
+
+    Runs on a worker thread and touches nothing but the cache directory.
+    """
+    if not _trim_lock.acquire(blocking=False):
+        return  # A trim is already running
+    try:
+        entries = []
+        for entry in os.scandir(CACHE_DIR):
+            try:
+                if entry.is_file():
+                    entries.append((entry.path, entry.stat()))
+            except OSError:
+                pass  # Replaced or removed meanwhile
+        entries.sort(key=lambda entry: entry[1].st_mtime, reverse=True)
+        total = 0
+        for path, stat in entries:
+            total += stat.st_size
+            if total > MAX_DISK_BYTES:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    finally:
+        _trim_lock.release()
+
+def _schedule_trim():
+    """Trim the disk cache once, after a batch of thumbnail writes has settled"""
+    global _trim_source_id
+    if _trim_source_id is not None:
+        GLib.source_remove(_trim_source_id)
+
+    def on_timeout():
+        global _trim_source_id
+        _trim_source_id = None
+        threading.Thread(target=_trim_disk_cache, daemon=True).start()
+        return False
+
+    _trim_source_id = GLib.timeout_add_seconds(TRIM_DELAY_S, on_timeout)
+
+def _save_thumbnail(pixbuf, thumbnail):
+    """Encode and write a thumbnail off the main thread"""
+    global _cache_dir_ready
+    if not _cache_dir_ready:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+        except OSError as e:
+            print(f"Error: Could not create {CACHE_DIR}: {e}")
+            return
+        _cache_dir_ready = True
+
+    def on_opened(file, result):
+        try:
+            stream = file.replace_finish(result)
+        except GLib.Error as e:
+            print(f"Error: Could not cache icon {thumbnail}: {e.message}")
+            return
+        pixbuf.save_to_streamv_async(stream, "png", [], [], None, on_saved, stream)
+
+    def on_saved(source, result, stream):
+        try:
+            GdkPixbuf.Pixbuf.save_to_stream_finish(result)
+        except GLib.Error as e:
+            print(f"Error: Could not cache icon {thumbnail}: {e.message}")
+            # Closing with a cancelled cancellable drops the partial file
+            cancellable = Gio.Cancellable()
+            cancellable.cancel()
+            stream.close_async(GLib.PRIORITY_LOW, cancellable, None)
+            return
+        # Closing moves the finished file into place
+        stream.close_async(GLib.PRIORITY_LOW, None, on_closed)
+
+    def on_closed(stream, result):
+        try:
+            stream.close_finish(result)
+        except GLib.Error as e:
+            print(f"Error: Could not cache icon {thumbnail}: {e.message}")
+            return
+        _schedule_trim()
+
+    Gio.File.new_for_path(thumbnail).replace_async(
+        None, False, Gio.FileCreateFlags.REPLACE_DESTINATION, GLib.PRIORITY_LOW, None, on_opened
+    )
+
+def _decode(path, size, callback):
+    """Decode and scale an image file off the main thread; callback(pixbuf or None)"""
+    def on_opened(file, result):
+        try:
+            stream = file.read_finish(result)
+        except GLib.Error:
+            callback(None)
+            return
+        GdkPixbuf.Pixbuf.new_from_stream_at_scale_async(stream, size, size, True, None, on_decoded, stream)
+
+    def on_decoded(source, result, stream):
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_stream_finish(result)
+        except GLib.Error:
+            pixbuf = None
+        stream.close_async(GLib.PRIORITY_LOW, None, None)
+        callback(pixbuf)
+
+    Gio.File.new_for_path(path).read_async(GLib.PRIORITY_LOW, None, on_opened)
+
+def load_icon(path, size, callback):
+    """Call callback(pixbuf or None) with the icon at path scaled to size
+
+    Memory hits call back right away; everything else calls back later from
+    the main loop.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        callback(None)
+        return
+    key = (path, size, mtime)
+
+    if key in _memory:
+        _memory.move_to_end(key)
+        callback(_memory[key])
+        return
+    if key in _pending:
+        _pending[key].append(callback)
+        return
+    _pending[key] = [callback]
+
+    def deliver(pixbuf):
+        if pixbuf is not None:
+            _remember(key, pixbuf)
+        for waiting in _pending.pop(key, []):
+            waiting(pixbuf)
+
+    def on_source_decoded(pixbuf):
+        if pixbuf is not None:
+            _save_thumbnail(pixbuf, thumbnail)
+        deliver(pixbuf)
+
+    def on_thumbnail_decoded(pixbuf):
+        if pixbuf is None:
+            _decode(path, size, on_source_decoded)
+            return
+        try:
+            os.utime(thumbnail)  # Recently used thumbnails are trimmed last
+        except OSError:
+            pass
+        deliver(pixbuf)
+
+    # A thumbnail newer than its source is reused, it is already the right size
+    thumbnail = _thumbnail_path(path, size)
+    try:
+        fresh = os.stat(thumbnail).st_mtime_ns >= mtime
+    except OSError:
+        fresh = False
+    if fresh:
+        _decode(thumbnail, size, on_thumbnail_decoded)
+    else:
+        _decode(path, size, on_source_decoded)
@@ -0,0 +1,100 @@
+-- Link a batch of devices into audio-selector.py's level meter from a single
+-- WirePlumber client, device N into the meter's AUXN input:
+--   wpexec link-meters.lua '{ "meter": "<node.name>", "devices": "<id>,<id>,...", "passive": true }'
+-- Sinks are linked through their monitor ports. The links linger until the
+-- meter stream goes away. Prints the number of links that were created.
+local args = ...
+if type(args) == "userdata" then
+  args = args:parse()
+end
+args = args or {}
+
+-- device node id -> meter channel
+local channels = {}
+local index = 0
+for device_id in string.gmatch(args.devices or "", "%d+") do
+  channels[device_id] = "AUX" .. index
+  index = index + 1
+end
+
+local meter_om = ObjectManager {
+  Interest {
+    type = "node",
+    Constraint { "node.name", "=", args.meter or "" },
+  }
+}
+
+local ports_om = ObjectManager {
+  Interest { type = "port" }
+}
+
+local links = {}
+local done = false
+
+local function finish (count)
+  done = true
+  print(count)
+  -- Make sure the server has created everything before exiting
+  Core.sync(function ()
+    Core.quit()
+  end)
+end
+
+local function try_link ()
+  if done then
+    return
+  end
+  local meter = meter_om:lookup()
+  if not meter then
+    return
+  end
+  local meter_id = tostring(meter["bound-id"])
+
+  -- The meter's ports show up shortly after its node
+  local inputs = {}
+  for port in ports_om:iterate {
+    Constraint { "node.id", "=", meter_id },
+    Constraint { "port.direction", "=", "in" },
+  } do
+    inputs[port.properties["audio.channel"]] = port
+  end
+  if inputs["AUX" .. (index - 1)] == nil then
+    return
+  end
+
+  -- Every output port of a device (the monitor ports for a sink) is mixed
+  -- into that device's channel
+  for port in ports_om:iterate { Constraint { "port.direction", "=", "out" } } do
+    local node_id = port.properties["node.id"]
+    local input = channels[node_id] and inputs[channels[node_id]]
+    if input then
+      local link = Link("link-factory", {
+        ["link.output.node"] = node_id,
+        ["link.output.port"] = tostring(port["bound-id"]),
+        ["link.input.node"] = meter_id,
+        ["link.input.port"] = tostring(input["bound-id"]),
+        ["link.passive"] = args.passive and "true" or "false",
+        ["object.linger"] = "true",
+      })
+      link:activate(Feature.Proxy.BOUND)
+      table.insert(links, link)
+    end
+  end
+  finish(#links)
+end
+
+meter_om:connect("installed", try_link)
+meter_om:connect("object-added", try_link)
+ports_om:connect("installed", try_link)
+ports_om:connect("object-added", try_link)
+
+-- Give up if the meter never appears (e.g. pw-record failed)
+Core.timeout_add(5000, function ()
+  if not done then
+    finish(0)
+  end
+  return false
+end)
+
+meter_om:activate()
+ports_om:activate()
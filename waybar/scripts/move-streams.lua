@@ -0,0 +1,36 @@
+-- Point a batch of streams at one device from a single WirePlumber client.
+-- Used by audio-selector.py after changing the default sink/source:
+--   wpexec move-streams.lua '{ "target": "<object.serial>", "streams": "<id>,<id>,..." }'
+-- Prints the number of streams that were re-targeted.
+local args = ...
+if type(args) == "userdata" then
+  args = args:parse()
+end
+args = args or {}
+
+local metadata_om = ObjectManager {
+  Interest {
+    type = "metadata",
+    Constraint { "metadata.name", "=", "default" },
+  }
+}
+
+metadata_om:connect("installed", function (om)
+  local metadata = om:lookup()
+  local moved = 0
+
+  if metadata and args.target then
+    for stream_id in string.gmatch(args.streams or "", "%d+") do
+      metadata:set(tonumber(stream_id), "target.object", "Spa:Id", tostring(args.target))
+      moved = moved + 1
+    end
+  end
+
+  print(moved)
+  -- Make sure the server has applied everything before exiting
+  Core.sync(function ()
+    Core.quit()
+  end)
+end)
+
+metadata_om:activate()
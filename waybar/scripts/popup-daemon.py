@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# Resident host for the waybar popups.
+# Imports GTK once, builds every popup window up front (hidden) and toggles
+# them on request, so a click only costs a socket round-trip. The popup
+# scripts hand their request over via popup_client.handoff() and fall back
+# to running standalone when the daemon is not running.
+import importlib.util
+import os
+import sys
+
+import popup_common
+import popup_client
+
+from gi.repository import Gtk
+
+popup_common.HOSTED = True
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Popup scripts hosted by the daemon (file names without .py)
+POPUP_SCRIPTS = [
+    'power-menu',
+    'mako-menu',
+    'audio-selector',
+    'weather-popup',
+    'waydroid-menu',
+    'waydroid-apps',
+]
+
+def load_popup(script):
+    """Import a popup script, which builds and registers its window"""
+    path = os.path.join(SCRIPTS_DIR, f"{script}.py")
+    spec = importlib.util.spec_from_file_location(f"popup_{script.replace('-', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except Exception as e:
+        # A broken popup must not take the others down; its script still works standalone
+        print(f"Error loading {script}: {e}")
+
+if not popup_common.serve(popup_client.DAEMON_SOCKET, popup_common.handle_request):
+    print("Popup daemon already running")
+    sys.exit(0)
+
+for script in POPUP_SCRIPTS:
+    load_popup(script)
+
+Gtk.main()
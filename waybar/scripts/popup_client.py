@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# Client side of the waybar popup IPC.
+# Kept free of gi imports so a popup script can hand its request to the
+# resident popup-daemon.py (or an already open copy of itself) before
+# paying for GTK startup.
+import fcntl
+import json
+import os
+import socket
+import sys
+
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/waybar-popups-{os.getuid()}"
+DAEMON_SOCKET = os.path.join(RUNTIME_DIR, "waybar-popups.sock")
+
+# Lock held by a standalone popup for its whole lifetime
+_instance_lock = None
+
+def popup_socket(name):
+    """Socket a standalone popup instance listens on"""
+    return os.path.join(RUNTIME_DIR, f"waybar-popup-{name}.sock")
+
+def send_request(path, request):
+    """Send a JSON request to a popup socket, return the reply or None"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1.0)
+            sock.connect(path)
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            reply = sock.makefile("r").readline().strip()
+            return reply or None
+    except OSError:
+        return None
+
+def handoff(name, args=None):
+    """Toggle the popup in the daemon or a running instance; exits the process if handled
+
+    Otherwise the caller becomes the single instance of the popup and holds
+    its per-user lock until it exits.
+    """
+    global _instance_lock
+    args = sys.argv[1:] if args is None else args
+    request = {'popup': name, 'action': 'toggle', 'args': args}
+
+    if send_request(DAEMON_SOCKET, request) == "ok":
+        sys.exit(0)
+
+    os.makedirs(RUNTIME_DIR, mode=0o700, exist_ok=True)
+    _instance_lock = open(os.path.join(RUNTIME_DIR, f"waybar-popup-{name}.lock"), "w")
+    try:
+        fcntl.flock(_instance_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        # Another instance owns the popup; if it is still starting up this
+        # request is dropped, which also debounces double clicks
+        send_request(popup_socket(name), request)
+        sys.exit(0)
+
+if __name__ == "__main__":
+    # Thin client: popup_client.py <popup-name> [args...]
+    if len(sys.argv) < 2:
+        print("Usage: popup_client.py <popup> [args...]")
+        sys.exit(1)
+    reply = send_request(DAEMON_SOCKET, {'popup': sys.argv[1], 'action': 'toggle', 'args': sys.argv[2:]})
+    sys.exit(0 if reply == "ok" else 1)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# Shared GTK plumbing for the waybar popups.
+# A popup script builds its window at import time and hands it to run():
+# standalone the window is shown and Gtk.main() runs until it closes, inside
+# popup-daemon.py the window stays built and is shown/hidden on request.
+import json
+import os
+import socket
+import sys
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, Gdk, GLib, Gio
+
+import popup_client
+
+# Set by popup-daemon.py before it loads the popup scripts
+HOSTED = False
+
+# Registered popups by name
+POPUPS = {}
+
+# Listening sockets, kept referenced for the lifetime of the process
+_servers = []
+
+# Pending background work that a closed standalone popup must wait for
+_holds = 0
+
+def load_css(win, name, css):
+    """Style a popup window, scoping the rules so hosted popups don't restyle each other"""
+    win.get_style_context().add_class(name)
+
+    rules = []
+    for chunk in css.decode().split('}'):
+        if '{' not in chunk:
+            continue
+        selectors, body = chunk.split('{', 1)
+        scoped = []
+        for selector in selectors.split(','):
+            selector = selector.strip()
+            if selector.startswith('window'):
+                scoped.append(f"window.{name}{selector[len('window'):]}")
+            else:
+                scoped.append(f"window.{name} {selector}")
+        rules.append(f"{', '.join(scoped)} {{{body}}}")
+
+    css_provider = Gtk.CssProvider()
+    css_provider.load_from_data('\n'.join(rules).encode())
+    Gtk.StyleContext.add_provider_for_screen(
+        Gdk.Screen.get_default(),
+        css_provider,
+        Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+    )
+
+def run_command(argv, callback):
+    """Run a command without blocking the main loop
+
+    callback(stdout) is called from the main loop with the command's output,
+    or None if it could not be started or exited unsuccessfully.
+    """
+    try:
+        proc = Gio.Subprocess.new(argv, Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_SILENCE)
+    except GLib.Error as e:
+        print(f"Error running {argv[0]}: {e.message}")
+        callback(None)
+        return None
+
+    def on_finished(proc, result):
+        try:
+            _, stdout, _ = proc.communicate_utf8_finish(result)
+        except GLib.Error as e:
+            print(f"Error running {argv[0]}: {e.message}")
+            stdout = None
+        callback(stdout if proc.get_successful() else None)
+
+    proc.communicate_utf8_async(None, None, on_finished)
+    return proc
+
+def spawn(argv):
+    """Start a command and forget about it (e.g. notify-send)"""
+    try:
+        return Gio.Subprocess.new(argv, Gio.SubprocessFlags.NONE)
+    except GLib.Error as e:
+        print(f"Error running {argv[0]}: {e.message}")
+        return None
+
+def _cancel_close(popup):
+    if popup['close_timeout_id'] is not None:
+        GLib.source_remove(popup['close_timeout_id'])
+        popup['close_timeout_id'] = None
+
+def _schedule_close(popup, delay, only_if_outside=False):
+    _cancel_close(popup)
+
+    def on_timeout():
+        popup['close_timeout_id'] = None
+        if not (only_if_outside and popup['mouse_entered']):
+            close(popup['name'])
+        return False  # Don't repeat the timeout
+
+    popup['close_timeout_id'] = GLib.timeout_add(delay, on_timeout)
+
+def keep_open(name):
+    """Treat the pointer as inside the popup, e.g. after switching views"""
+    popup = POPUPS[name]
+    popup['mouse_entered'] = True
+    _cancel_close(popup)
+
+def present(name, args=()):
+    """Refresh and show a registered popup"""
+    popup = POPUPS[name]
+    win = popup['window']
+
+    _cancel_close(popup)
+    popup['mouse_entered'] = False
+    popup['args'] = list(args)
+    if popup['present']:
+        popup['present'](list(args))
+
+    if popup['shown']:
+        win.show()
+    else:
+        win.show_all()
+        popup['shown'] = True
+    win.present()
+    popup['visible'] = True
+
+    # Auto-close after a period of inactivity
+    if popup['inactivity_id'] is not None:
+        GLib.source_remove(popup['inactivity_id'])
+    popup['inactivity_id'] = GLib.timeout_add_seconds(popup['timeout'], lambda: close(name))
+
+def close(name, *_):
+    """Close a popup: hidden when hosted by the daemon, quits the process otherwise"""
+    popup = POPUPS[name]
+    _cancel_close(popup)
+    if popup['inactivity_id'] is not None:
+        GLib.source_remove(popup['inactivity_id'])
+        popup['inactivity_id'] = None
+
+    if popup['visible']:
+        popup['visible'] = False
+        popup['window'].hide()
+        if popup['hide']:
+            popup['hide']()
+
+    if not HOSTED and not _holds:
+        Gtk.main_quit()
+    return False  # Usable directly as a GLib source callback
+
+def hold():
+    """Keep a standalone popup's process alive after it closes, until release()"""
+    global _holds
+    _holds += 1
+
+def release():
+    """Drop a hold(); quits a standalone process whose popups are all closed"""
+    global _holds
+    _holds -= 1
+    if not HOSTED and not _holds and not any(popup['visible'] for popup in POPUPS.values()):
+        Gtk.main_quit()
+
+def set_args(name, args):
+    """Record what a popup is showing after it changed itself (e.g. switched tabs)"""
+    POPUPS[name]['args'] = list(args)
+
+def toggle(name, args=()):
+    """Close the popup if it is showing the same request, otherwise show it"""
+    popup = POPUPS[name]
+    if popup['visible'] and popup['args'] == list(args):
+        close(name)
+    else:
+        present(name, args)
+
+def handle_request(request):
+    """Dispatch a request from popup_client to a registered popup"""
+    name = request.get('popup')
+    if name not in POPUPS:
+        # A standalone instance only hosts itself
+        if HOSTED or len(POPUPS) != 1:
+            return "unknown"
+        name = next(iter(POPUPS))
+
+    action = request.get('action')
+    if action == 'toggle':
+        toggle(name, request.get('args', []))
+    elif action == 'show':
+        present(name, request.get('args', []))
+    else:
+        return "error"
+    return "ok"
+
+def _install_autoclose(popup, close_on_focus_out):
+    """Smart click-away-to-close with hover delay"""
+    def on_enter_notify(widget, event):
+        # Only track actual window entry, not child widget crossings
+        if event.detail != Gdk.NotifyType.INFERIOR:
+            popup['mouse_entered'] = True
+            _cancel_close(popup)
+        return False
+
+    def on_leave_notify(widget, event):
+        # Only track actual window exit, not child widget crossings
+        if event.detail != Gdk.NotifyType.INFERIOR and popup['visible']:
+            popup['mouse_entered'] = False
+            # Close after 1 second of mouse being outside
+            _schedule_close(popup, 1000, only_if_outside=True)
+        return False
+
+    def on_focus_out(widget, event):
+        if not popup['visible']:
+            return False
+        if close_on_focus_out:
+            # Always close on focus loss after a short delay
+            # If focus returns (clicking internal widgets), it will be cancelled
+            _schedule_close(popup, 150)
+        elif not popup['mouse_entered']:
+            # Clicked outside without ever entering the window
+            _schedule_close(popup, 200, only_if_outside=True)
+        return False
+
+    def on_focus_in(widget, event):
+        if close_on_focus_out:
+            _cancel_close(popup)
+        return False
+
+    win = popup['window']
+    win.connect("enter-notify-event", on_enter_notify)
+    win.connect("leave-notify-event", on_leave_notify)
+    win.connect("focus-out-event", on_focus_out)
+    win.connect("focus-in-event", on_focus_in)
+
+def serve(path, handler):
+    """Answer popup requests on a unix socket; False if a live instance already owns it"""
+    if popup_client.send_request(path, {'action': 'ping'}) == "ok":
+        return False
+
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(8)
+    server.setblocking(False)
+
+    def on_connection(fd, condition):
+        try:
+            conn, _ = server.accept()
+        except BlockingIOError:
+            return True
+        with conn:
+            conn.settimeout(1.0)
+            try:
+                request = json.loads(conn.makefile("r").readline())
+                reply = "ok" if request.get('action') == 'ping' else handler(request)
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"Bad popup request: {e}")
+                reply = "error"
+            try:
+                conn.sendall(f"{reply}\n".encode())
+            except OSError:
+                pass
+        return True
+
+    GLib.io_add_watch(server.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN, on_connection)
+    _servers.append(server)
+    return True
+
+def run(name, win, on_present=None, on_hide=None, timeout=30, close_on_focus_out=True):
+    """Register a built popup window; standalone it is shown and the main loop runs"""
+    popup = {
+        'name': name,
+        'window': win,
+        'present': on_present,
+        'hide': on_hide,
+        'timeout': timeout,
+        'args': [],
+        'shown': False,
+        'visible': False,
+        'mouse_entered': False,
+        'close_timeout_id': None,
+        'inactivity_id': None,
+    }
+    POPUPS[name] = popup
+    _install_autoclose(popup, close_on_focus_out)
+
+    if HOSTED:
+        return
+
+    # Standalone: answer toggles from later invocations instead of stacking windows
+    # (popup_client.handoff already holds this popup's instance lock)
+    serve(popup_client.popup_socket(name), handle_request)
+    present(name, sys.argv[1:])
+    Gtk.main()
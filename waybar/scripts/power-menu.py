@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
+import popup_client
+
+POPUP_NAME = "power-menu"
+
+# Let a running popup daemon show the menu before paying for GTK startup
+if __name__ == "__main__":
+    popup_client.handoff(POPUP_NAME)
+
 import gi
-import subprocess
 import sys
 import os
 import getpass
+import json
+import glob
+import shutil
+import time
 from datetime import timedelta
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk, GLib
+from gi.repository import Gtk, Gdk, GLib, Gio
 
 try:
     gi.require_version("GtkLayerShell", "0.1")
@@ -16,6 +27,8 @@ try:
 except (ValueError, ImportError):
     HAS_LAYER_SHELL = False
 
+import popup_common
+
 # Get system uptime
 def get_uptime():
     try:
@@ -36,13 +49,20 @@ def get_uptime():
         return "Unknown"
 
 # Power actions
+# Actions with a 'logind' method are called on the login manager over the
+# system bus; 'argv' is run instead when the bus is not reachable. 'can' is
+# the matching availability check, used to grey out what this machine can't do,
+# and 'inhibited_by' the inhibitor lock type that holds the action up.
+# 'close_clients' actions first ask every window to close so apps can save;
+# logind is checked beforehand ('polkit' is the action it authorizes) so a
+# refused call can't leave the session emptied.
 ACTIONS = [
     {
         'id': 'lock',
         'label': 'Lock Screen',
         'icon': '',
         'key': 'l',
-        'command': 'hyprlock',
+        'argv': ['hyprlock'],
         'confirm': False,
         'description': 'Lock your screen'
     },
@@ -51,7 +71,10 @@ ACTIONS = [
         'label': 'Suspend',
         'icon': '',
         'key': 's',
-        'command': 'systemctl suspend',
+        'logind': 'Suspend',
+        'can': 'CanSuspend',
+        'argv': ['systemctl', 'suspend'],
+        'inhibited_by': 'sleep',
         'confirm': False,
         'description': 'Suspend to RAM'
     },
@@ -60,7 +83,10 @@ ACTIONS = [
         'label': 'Hibernate',
         'icon': '󰒲',
         'key': 'h',
-        'command': 'systemctl hibernate',
+        'logind': 'Hibernate',
+        'can': 'CanHibernate',
+        'argv': ['systemctl', 'hibernate'],
+        'inhibited_by': 'sleep',
         'confirm': False,
         'description': 'Suspend to disk'
     },
@@ -69,7 +95,8 @@ ACTIONS = [
         'label': 'Logout',
         'icon': '󰩈',
         'key': 'o',
-        'command': 'hyprctl dispatch exit',
+        'argv': ['hyprctl', 'dispatch', 'exit'],
+        'close_clients': True,
         'confirm': True,
         'description': 'End your session'
     },
@@ -78,7 +105,12 @@ ACTIONS = [
         'label': 'Reboot',
         'icon': '',
         'key': 'r',
-        'command': 'systemctl reboot',
+        'logind': 'Reboot',
+        'can': 'CanReboot',
+        'argv': ['systemctl', 'reboot'],
+        'polkit': 'org.freedesktop.login1.reboot',
+        'close_clients': True,
+        'inhibited_by': 'shutdown',
         'confirm': True,
         'description': 'Restart your computer'
     },
@@ -87,17 +119,139 @@ ACTIONS = [
         'label': 'Shutdown',
         'icon': '⏻',
         'key': 'p',
-        'command': 'systemctl poweroff',
+        'logind': 'PowerOff',
+        'can': 'CanPowerOff',
+        'argv': ['systemctl', 'poweroff'],
+        'polkit': 'org.freedesktop.login1.power-off',
+        'close_clients': True,
+        'inhibited_by': 'shutdown',
         'confirm': True,
         'description': 'Power off your computer'
     }
 ]
 
+# Flags for the login manager's RebootWithFlags
+REBOOT_VIA_KEXEC = 1 << 1
+SOFT_REBOOT = 1 << 2
+
+MODULES_DIR = "/usr/lib/modules"
+
+def soft_reboot_available():
+    """systemd 254+ can restart userspace without going through the firmware"""
+    return os.path.exists("/usr/lib/systemd/system/soft-reboot.target")
+
+def kexec_supported():
+    """The running kernel can kexec and the kexec tool is installed"""
+    return os.path.exists("/sys/kernel/kexec_loaded") and shutil.which("kexec") is not None
+
+def find_kexec_kernel():
+    """(version, image, initramfs) of the newest installed kernel, or None
+
+    Looked up whenever it is needed: a kernel update during the session
+    removes the old kernel's module directory.
+    """
+    # After a kernel update this is the new kernel, otherwise the running one
+    images = glob.glob(os.path.join(MODULES_DIR, "*", "vmlinuz"))
+    if not images:
+        return None
+    image = max(images, key=os.path.getmtime)
+    module_dir = os.path.dirname(image)
+
+    # Arch names the initramfs after the kernel package
+    try:
+        with open(os.path.join(module_dir, "pkgbase")) as f:
+            pkgbase = f.read().strip()
+    except OSError:
+        pkgbase = "linux"
+    initramfs = f"/boot/initramfs-{pkgbase}.img"
+    if not os.path.exists(initramfs):
+        return None
+    return os.path.basename(module_dir), image, initramfs
+
+# Faster restarts, offered after Reboot when this machine supports them
+fast_reboots = []
+if soft_reboot_available():
+    fast_reboots.append({
+        'id': 'soft-reboot',
+        'label': 'Soft Reboot',
+        'icon': '󰜉',
+        'key': 'u',
+        'logind': 'RebootWithFlags',
+        'flags': SOFT_REBOOT,
+        'can': 'CanReboot',
+        'argv': ['systemctl', 'soft-reboot'],
+        'polkit': 'org.freedesktop.login1.reboot',
+        'close_clients': True,
+        'inhibited_by': 'shutdown',
+        'confirm': True,
+        'description': 'Restart userspace, keep the kernel'
+    })
+if kexec_supported():
+    fast_reboots.append({
+        'id': 'kexec',
+        'label': 'Kexec Reboot',
+        'icon': '󰑓',
+        'key': 'k',
+        'logind': 'RebootWithFlags',
+        'flags': REBOOT_VIA_KEXEC,
+        'can': 'CanReboot',
+        'argv': ['systemctl', 'kexec'],
+        'polkit': 'org.freedesktop.login1.reboot',
+        'close_clients': True,
+        'inhibited_by': 'shutdown',
+        'confirm': True,
+        'description': 'Boot the newest kernel, skip the firmware'
+    })
+reboot_index = next(i for i, action in enumerate(ACTIONS) if action['id'] == 'reboot')
+ACTIONS[reboot_index + 1:reboot_index + 1] = fast_reboots
+
 # Global state
 current_view = 'main'  # 'main' or 'confirm'
 pending_action = None
-mouse_entered = False
-close_timeout_id = None
+kexec_kernel = None  # find_kexec_kernel() as of the last time the menu opened
+
+LOGIND_BUS_NAME = "org.freedesktop.login1"
+LOGIND_OBJECT_PATH = "/org/freedesktop/login1"
+LOGIND_INTERFACE = "org.freedesktop.login1.Manager"
+
+# System bus connection, opened once at startup
+system_bus = None
+
+INHIBITOR_POLL_MS = 500
+INHIBITOR_WAIT_S = 60
+
+# Inhibitor locks as of the last ListInhibitors: (what, who, why, mode, uid, pid)
+inhibitors = []
+
+POLKIT_BUS_NAME = "org.freedesktop.PolicyKit1"
+POLKIT_OBJECT_PATH = "/org/freedesktop/PolicyKit1/Authority"
+POLKIT_INTERFACE = "org.freedesktop.PolicyKit1.Authority"
+POLKIT_ALLOW_USER_INTERACTION = 1
+POLKIT_TIMEOUT_MS = 5 * 60 * 1000  # The user may take a while to authenticate
+
+# Action held up by windows that did not close
+straggler_action = None
+
+# Action waiting for its blocking inhibitors to be released
+waiting_action = None
+wait_deadline = None
+wait_source_id = None
+
+def logind_call(method, parameters, reply_type, callback, flags=Gio.DBusCallFlags.NONE):
+    """Call a login manager method; callback(unpacked reply or None)"""
+    def on_reply(connection, result):
+        try:
+            reply = connection.call_finish(result).unpack()
+        except GLib.Error as e:
+            print(f"Error calling {method}: {e.message}")
+            reply = None
+        callback(reply)
+
+    system_bus.call(
+        LOGIND_BUS_NAME, LOGIND_OBJECT_PATH, LOGIND_INTERFACE, method,
+        parameters, GLib.VariantType.new(reply_type) if reply_type else None,
+        flags, -1, None, on_reply
+    )
 
 # Create main window
 win = Gtk.Window()
@@ -117,243 +271,741 @@ if HAS_LAYER_SHELL:
     GtkLayerShell.set_margin(win, GtkLayerShell.Edge.RIGHT, 10)
     GtkLayerShell.set_keyboard_mode(win, GtkLayerShell.KeyboardMode.ON_DEMAND)
 
-# Create main container (will switch between main view and confirm view)
-main_container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+# Both views are built once and switched through a stack; the confirm view
+# is filled in for the action being confirmed
+views = Gtk.Stack()
+views.set_vhomogeneous(False)
+views.set_interpolate_size(True)
+
+def load_kexec_kernel(action):
+    """Load the newest kernel as root (polkit asks), then reboot into it
+
+    Always loads, replacing a kernel loaded earlier in the session that may
+    since have been updated away.
+    """
+    kernel = find_kexec_kernel()
+    if kernel is None:
+        notify(f"{action['label']}: no installed kernel found", 'critical')
+        close_popup()
+        return
+    version, image, initramfs = kernel
+    popup_common.hold()
+
+    def on_loaded(output):
+        if output is None:
+            notify(f"{action['label']}: could not load kernel {version}", 'critical')
+        else:
+            execute_action(action, kernel_loaded=True)
+        popup_common.release()
+
+    popup_common.run_command(
+        ['pkexec', 'kexec', '--load', image, f'--initrd={initramfs}', '--reuse-cmdline'],
+        on_loaded
+    )
+    close_popup()
 
-def execute_action(action):
+def execute_action(action, kernel_loaded=False, clients_closed=False):
     """Execute a power action"""
-    try:
-        # For logout, just run the command directly
-        if action['id'] == 'logout':
-            subprocess.Popen(action['command'], shell=True)
-        else:
-            subprocess.run(action['command'], shell=True, check=True)
-        Gtk.main_quit()
-    except Exception as e:
-        print(f"Error executing {action['label']}: {e}")
+    if action['id'] == 'kexec' and not kernel_loaded:
+        load_kexec_kernel(action)
+        return
 
-def show_main_view():
-    """Show the main power menu"""
-    global current_view, mouse_entered, close_timeout_id
-    current_view = 'main'
+    if action.get('close_clients') and not clients_closed:
+        popup_common.hold()
 
-    # Reset hover state to prevent auto-close when switching views
-    mouse_entered = True
-    if close_timeout_id is not None:
-        GLib.source_remove(close_timeout_id)
-        close_timeout_id = None
+        def on_checked(ok):
+            if ok:
+                close_clients(on_closed)
+            else:
+                popup_common.release()
 
-    # Clear container
-    for child in main_container.get_children():
-        main_container.remove(child)
+        def on_closed(stragglers):
+            if stragglers:
+                # Usually a "save changes?" dialog: let the user decide
+                popup_common.present(POPUP_NAME)
+                show_stragglers_view(action, stragglers)
+            else:
+                execute_action(action, kernel_loaded=True, clients_closed=True)
+            popup_common.release()
+
+        # Hide the menu first so it is not among the windows being closed
+        close_popup()
+        check_action(action, on_checked)
+        return
+
+    if 'logind' in action and system_bus is not None:
+        # Keep a standalone menu alive until logind has the request
+        popup_common.hold()
+
+        def on_done(reply):
+            # The menu is gone by now, so a refusal has to be reported
+            if reply is None:
+                notify(f"{action['label']} failed", 'critical')
+            popup_common.release()
+
+        if 'flags' in action:
+            parameters = GLib.Variant('(t)', (action['flags'],))
+        else:
+            parameters = GLib.Variant('(b)', (True,))  # interactive
+        # Let polkit ask for authentication if the action needs it
+        logind_call(
+            action['logind'], parameters, None, on_done,
+            Gio.DBusCallFlags.ALLOW_INTERACTIVE_AUTHORIZATION
+        )
+    elif popup_common.spawn(action['argv']) is None:
+        notify(f"{action['label']} failed: could not run {action['argv'][0]}", 'critical')
+        return
+    close_popup()
+
+def authorize(action_ids, callback):
+    """Have polkit authenticate the user for action_ids now; callback(authorized)
+
+    logind's own check right after reuses the kept authorization instead of
+    asking again.
+    """
+    subject = ('system-bus-name', {'name': GLib.Variant('s', system_bus.get_unique_name())})
+
+    def check(remaining):
+        if not remaining:
+            callback(True)
+            return
+        system_bus.call(
+            POLKIT_BUS_NAME, POLKIT_OBJECT_PATH, POLKIT_INTERFACE, "CheckAuthorization",
+            GLib.Variant('((sa{sv})sa{ss}us)', (subject, remaining[0], {}, POLKIT_ALLOW_USER_INTERACTION, '')),
+            GLib.VariantType.new('((bba{ss}))'), Gio.DBusCallFlags.NONE,
+            POLKIT_TIMEOUT_MS, None, on_reply, remaining
+        )
+
+    def on_reply(connection, result, remaining):
+        try:
+            (authorized, _, _), = connection.call_finish(result).unpack()
+        except GLib.Error as e:
+            print(f"Error checking authorization for {remaining[0]}: {e.message}")
+            authorized = False
+        if authorized:
+            check(remaining[1:])
+        else:
+            callback(False)
+
+    check(list(action_ids))
+
+def check_action(action, callback):
+    """callback(ok): whether logind will accept the action right now
+
+    Checks availability, blocking inhibitors and, when logind would ask for
+    authentication, gets that done first. Blocked actions get the confirm
+    view back, with the blockers and the option to wait.
+    """
+    if 'logind' not in action or system_bus is None:
+        callback(True)
+        return
+
+    def on_can(reply):
+        # "yes", "no", "na" or "challenge" (allowed after authenticating)
+        result = reply[0] if reply else 'yes'
+        if result not in ('yes', 'challenge'):
+            notify(f"{action['label']} is not available", 'critical')
+            callback(False)
+            return
+        refresh_inhibitors(lambda: on_inhibitors(result == 'challenge'))
+
+    def on_inhibitors(challenge):
+        if action_inhibitors(action, 'block'):
+            popup_common.present(POPUP_NAME)
+            show_confirm_view(action)
+            callback(False)
+        elif challenge:
+            logind_call('ListSessions', None, '(a(susso))', on_sessions)
+        else:
+            callback(True)
+
+    def on_sessions(reply):
+        # Other users' sessions need the -multiple-sessions authorization too
+        action_ids = [action['polkit']]
+        if reply and any(uid != os.getuid() for _, uid, _, _, _ in reply[0]):
+            action_ids.append(f"{action['polkit']}-multiple-sessions")
+
+        def on_authorized(authorized):
+            if not authorized:
+                notify(f"{action['label']} cancelled")
+            callback(authorized)
+
+        authorize(action_ids, on_authorized)
+
+    logind_call(action['can'], None, '(s)', on_can)
+
+def update_kexec_kernel():
+    """Show which kernel a kexec reboot would boot, greying it out if there is none"""
+    global kexec_kernel
+    if 'kexec' not in action_rows:
+        return
+    kexec_kernel = find_kexec_kernel()
+    if kexec_kernel:
+        description = f"Boot {kexec_kernel[0]}, skip the firmware"
+    else:
+        description = "No installed kernel found"
+    action_descriptions['kexec'].set_markup(f"<small>{description}</small>")
+    action_rows['kexec'].set_sensitive(kexec_kernel is not None)
+
+def update_availability():
+    """Grey out the actions logind says this machine can't perform"""
+    if system_bus is None:
+        return
+    for action in ACTIONS:
+        if 'can' not in action:
+            continue
+
+        def on_reply(reply, action=action):
+            # "yes", "no", "na" or "challenge" (allowed after authenticating)
+            available = reply is None or reply[0] in ('yes', 'challenge')
+            if action['id'] == 'kexec':
+                available = available and kexec_kernel is not None
+            action_rows[action['id']].set_sensitive(available)
+
+        logind_call(action['can'], None, '(s)', on_reply)
+
+def refresh_inhibitors(callback=None):
+    """Fetch the active inhibitor locks in one call, then callback()"""
+    def on_reply(reply):
+        global inhibitors
+        inhibitors = reply[0] if reply else []
+        if callback:
+            callback()
+
+    if system_bus is None:
+        on_reply(None)
+        return
+    logind_call('ListInhibitors', None, '(a(ssssuu))', on_reply)
+
+def action_inhibitors(action, mode=None):
+    """Inhibitor locks that hold up an action, optionally only those in one mode"""
+    what = action.get('inhibited_by')
+    if not what:
+        return []
+    return [
+        lock for lock in inhibitors
+        if what in lock[0].split(':') and (mode is None or lock[3] == mode)
+    ]
+
+CLOSE_CLIENTS_TIMEOUT_S = 10
+CLOSE_CLIENTS_POLL_MS = 250
+
+def hyprland_socket():
+    """Path of Hyprland's request socket, or None outside Hyprland"""
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        return None
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    for base in (os.path.join(runtime_dir, "hypr"), "/tmp/hypr"):
+        path = os.path.join(base, signature, ".socket.sock")
+        if os.path.exists(path):
+            return path
+    return None
+
+def hyprland_request(request, callback):
+    """Send one request over Hyprland's IPC socket; callback(reply text or None)"""
+    path = hyprland_socket()
+    if path is None:
+        callback(None)
+        return
+
+    def on_connected(client, result):
+        try:
+            connection = client.connect_finish(result)
+            connection.get_output_stream().write_all(request.encode(), None)
+        except GLib.Error as e:
+            print(f"Error talking to Hyprland: {e.message}")
+            callback(None)
+            return
+        # Hyprland answers and closes the connection
+        reply = Gio.MemoryOutputStream.new_resizable()
+        reply.splice_async(
+            connection.get_input_stream(),
+            Gio.OutputStreamSpliceFlags.CLOSE_SOURCE | Gio.OutputStreamSpliceFlags.CLOSE_TARGET,
+            GLib.PRIORITY_DEFAULT, None, on_read, connection
+        )
+
+    def on_read(reply, result, connection):
+        try:
+            reply.splice_finish(result)
+        except GLib.Error as e:
+            print(f"Error talking to Hyprland: {e.message}")
+            callback(None)
+            return
+        callback((reply.steal_as_bytes().get_data() or b'').decode(errors='replace'))
+
+    Gio.SocketClient().connect_async(Gio.UnixSocketAddress.new(path), None, on_connected)
+
+def get_clients(callback):
+    """callback(list of Hyprland client dicts, or None if they could not be listed)"""
+    def on_reply(reply):
+        try:
+            clients = json.loads(reply) if reply else None
+        except ValueError:
+            clients = None
+        callback(clients if isinstance(clients, list) else None)
+
+    hyprland_request('j/clients', on_reply)
+
+# Reported in place of the windows when Hyprland could not list them
+UNKNOWN_CLIENTS = [{'class': 'Unknown', 'title': 'Hyprland did not list its windows'}]
+
+def close_clients(callback):
+    """Ask every window to close at once, then callback(stragglers)
+
+    All windows get the close request in one batched IPC call and close
+    concurrently; the clients list is polled until it is empty or
+    CLOSE_CLIENTS_TIMEOUT_S passes, and whatever is left is passed on.
+    A failed listing never counts as "all closed": only an empty list does.
+    """
+    if hyprland_socket() is None:
+        callback([])  # Not a Hyprland session, nothing to close
+        return
+    deadline = time.monotonic() + CLOSE_CLIENTS_TIMEOUT_S
+    remaining = None  # Last successfully listed clients
+
+    def retry(next_step):
+        """List the clients again shortly, or give up at the deadline"""
+        if time.monotonic() >= deadline:
+            callback(remaining or UNKNOWN_CLIENTS)
+            return
+
+        def on_timeout():
+            get_clients(next_step)
+            return False
+
+        GLib.timeout_add(CLOSE_CLIENTS_POLL_MS, on_timeout)
+
+    def on_clients(clients):
+        nonlocal remaining
+        if clients is None:
+            retry(on_clients)
+            return
+        if not clients:
+            callback([])
+            return
+        remaining = clients
+        notify(f"Closing {len(clients)} window{'s' if len(clients) != 1 else ''}…", 'low')
+        batch = ';'.join(f"dispatch closewindow address:{client['address']}" for client in clients)
+        hyprland_request(f"[[BATCH]]{batch}", lambda reply: get_clients(on_polled))
+
+    def on_polled(clients):
+        nonlocal remaining
+        if clients is not None:
+            if not clients:
+                callback([])
+                return
+            remaining = clients
+        retry(on_polled)
+
+    get_clients(on_clients)
+
+def notify(message, urgency='normal'):
+    popup_common.spawn([
+        'notify-send', '-u', urgency, '-a', 'Power Menu',
+        message, '-i', 'system-shutdown', '-t', '5000', '-r', '9030'
+    ])
+
+def stop_waiting():
+    """Give up waiting for inhibitors to be released"""
+    global waiting_action, wait_source_id
+    if waiting_action is None:
+        return
+    waiting_action = None
+    if wait_source_id is not None:
+        GLib.source_remove(wait_source_id)
+        wait_source_id = None
+    popup_common.release()
+
+def wait_for_inhibitors(action):
+    """Run an action once nothing blocks it any more, giving up after INHIBITOR_WAIT_S
+
+    Keeps going if the menu is closed meanwhile; Cancel stops it.
+    """
+    global waiting_action, wait_deadline
+    stop_waiting()
+    waiting_action = action
+    wait_deadline = time.monotonic() + INHIBITOR_WAIT_S
+    popup_common.hold()
+
+    def poll():
+        global wait_source_id
+        wait_source_id = None
+        refresh_inhibitors(on_refreshed)
+        return False
+
+    def on_refreshed():
+        global wait_source_id
+        if waiting_action is not action:
+            return  # Cancelled meanwhile
+        blockers = action_inhibitors(action, 'block')
+        if not blockers:
+            execute_action(action)
+            stop_waiting()
+        elif time.monotonic() >= wait_deadline:
+            stop_waiting()
+            names = ', '.join(lock[1] for lock in blockers)
+            notify(f"{action['label']} still blocked by {names}", 'critical')
+        else:
+            wait_source_id = GLib.timeout_add(INHIBITOR_POLL_MS, poll)
+        if pending_action is action:
+            update_inhibitor_list(action)
 
-    main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+    poll()
 
-    # Header with close button
+def on_system_bus(source, result):
+    global system_bus
+    try:
+        system_bus = Gio.bus_get_finish(result)
+    except GLib.Error as e:
+        print(f"Error connecting to the system bus: {e.message}")
+        return
+    update_availability()
+    # A standalone menu is already showing, opened before the bus was there
+    refresh_inhibitors(on_inhibitors_refreshed)
+
+Gio.bus_get(Gio.BusType.SYSTEM, None, on_system_bus)
+
+def close_popup(*_):
+    """Close the menu (hidden when hosted by the popup daemon)"""
+    return popup_common.close(POPUP_NAME)
+
+def make_header(header_label):
+    """Header row with a close button"""
     header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
     header_box.set_border_width(15)
 
-    header_label = Gtk.Label()
     header_label.set_xalign(0)
-    header_label.set_markup("<span size='large'><b>⏻ Power Menu</b></span>")
     header_label.set_hexpand(True)
 
     close_button = Gtk.Button(label="✕")
-    close_button.connect("clicked", lambda *_: Gtk.main_quit())
+    close_button.connect("clicked", close_popup)
     close_button.get_style_context().add_class("close-button")
 
     header_box.pack_start(header_label, True, True, 0)
     header_box.pack_start(close_button, False, False, 0)
+    return header_box
+
+# Main view
+main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+
+main_header_label = Gtk.Label()
+main_header_label.set_markup("<span size='large'><b>⏻ Power Menu</b></span>")
+main_box.pack_start(make_header(main_header_label), False, False, 0)
+
+# Add separator
+separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
+main_box.pack_start(separator, False, False, 0)
+
+# System info
+info_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+info_box.set_border_width(12)
+info_box.get_style_context().add_class("info-box")
+
+# User info
+user_label = Gtk.Label()
+username = getpass.getuser()
+user_label.set_markup(f"<small>User: <b>{username}</b></small>")
+user_label.set_xalign(0)
+
+# Uptime info, refreshed whenever the menu opens
+uptime_label = Gtk.Label()
+uptime_label.set_xalign(0)
+
+info_box.pack_start(user_label, False, False, 0)
+info_box.pack_start(uptime_label, False, False, 0)
+main_box.pack_start(info_box, False, False, 0)
+
+# Add another separator
+separator2 = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
+main_box.pack_start(separator2, False, False, 0)
+
+# Action buttons
+actions_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+actions_box.set_border_width(8)
+
+def on_action_click(widget, event, action):
+    if action['confirm'] or action_inhibitors(action, 'block'):
+        show_confirm_view(action)
+    else:
+        execute_action(action)
+
+# Hover effect
+def on_action_enter(widget, event):
+    widget.get_style_context().add_class("action-button-hover")
+
+def on_action_leave(widget, event):
+    widget.get_style_context().remove_class("action-button-hover")
+
+# Action rows and their description labels by id
+action_rows = {}
+action_descriptions = {}
+
+for action in ACTIONS:
+    button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+    button_box.set_border_width(10)
+    button_box.get_style_context().add_class("action-button")
+
+    # Make it a button
+    event_box = Gtk.EventBox()
+    event_box.add(button_box)
+    event_box.set_name(action['id'])
+
+    # Icon
+    icon_label = Gtk.Label(label=action['icon'])
+    icon_label.set_width_chars(3)
+    icon_label.get_style_context().add_class("action-icon")
+
+    # Text container
+    text_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
+    text_box.set_hexpand(True)
+
+    # Action label
+    label = Gtk.Label()
+    label.set_markup(f"<b>{action['label']}</b>")
+    label.set_xalign(0)
 
-    main_box.pack_start(header_box, False, False, 0)
-
-    # Add separator
-    separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
-    main_box.pack_start(separator, False, False, 0)
-
-    # System info
-    info_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
-    info_box.set_border_width(12)
-    info_box.get_style_context().add_class("info-box")
-
-    # User info
-    user_label = Gtk.Label()
-    username = getpass.getuser()
-    user_label.set_markup(f"<small>User: <b>{username}</b></small>")
-    user_label.set_xalign(0)
-
-    # Uptime info
-    uptime_label = Gtk.Label()
-    uptime_label.set_markup(f"<small>Uptime: <b>{get_uptime()}</b></small>")
-    uptime_label.set_xalign(0)
-
-    info_box.pack_start(user_label, False, False, 0)
-    info_box.pack_start(uptime_label, False, False, 0)
-    main_box.pack_start(info_box, False, False, 0)
+    # Description
+    desc_label = Gtk.Label()
+    desc_label.set_markup(f"<small>{action['description']}</small>")
+    desc_label.set_xalign(0)
+    desc_label.get_style_context().add_class("action-description")
 
-    # Add another separator
-    separator2 = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
-    main_box.pack_start(separator2, False, False, 0)
+    text_box.pack_start(label, False, False, 0)
+    text_box.pack_start(desc_label, False, False, 0)
+
+    # Keyboard shortcut hint
+    key_label = Gtk.Label()
+    key_label.set_markup(f"<small><tt>{action['key'].upper()}</tt></small>")
+    key_label.get_style_context().add_class("key-hint")
 
-    # Action buttons
-    actions_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
-    actions_box.set_border_width(8)
-
-    for action in ACTIONS:
-        button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-        button_box.set_border_width(10)
-        button_box.get_style_context().add_class("action-button")
+    button_box.pack_start(icon_label, False, False, 0)
+    button_box.pack_start(text_box, True, True, 0)
+    button_box.pack_start(key_label, False, False, 0)
 
-        # Make it a button
-        event_box = Gtk.EventBox()
-        event_box.add(button_box)
-        event_box.set_name(action['id'])
+    event_box.connect("button-press-event", on_action_click, action)
+    event_box.connect("enter-notify-event", on_action_enter)
+    event_box.connect("leave-notify-event", on_action_leave)
+
+    actions_box.pack_start(event_box, False, False, 0)
+    action_rows[action['id']] = event_box
+    action_descriptions[action['id']] = desc_label
+
+main_box.pack_start(actions_box, True, True, 0)
+views.add_named(main_box, "main")
+
+# Confirm view
+confirm_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
 
-        # Icon
-        icon_label = Gtk.Label(label=action['icon'])
-        icon_label.set_width_chars(3)
-        icon_label.get_style_context().add_class("action-icon")
+confirm_header_label = Gtk.Label()
+confirm_box.pack_start(make_header(confirm_header_label), False, False, 0)
+
+# Add separator
+confirm_separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
+confirm_box.pack_start(confirm_separator, False, False, 0)
+
+# Confirmation message
+message_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+message_box.set_border_width(30)
+message_box.set_halign(Gtk.Align.CENTER)
+
+confirm_icon_label = Gtk.Label()
+
+message_label = Gtk.Label()
+message_label.set_line_wrap(True)
+message_label.set_max_width_chars(30)
+message_label.set_justify(Gtk.Justification.CENTER)
+
+message_box.pack_start(confirm_icon_label, False, False, 0)
+message_box.pack_start(message_label, False, False, 10)
+
+# Inhibitor locks holding the action up, filled in by update_inhibitor_list()
+inhibitor_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+inhibitor_box.set_border_width(8)
+inhibitor_box.get_style_context().add_class("inhibitor-box")
+inhibitor_box.set_no_show_all(True)
+message_box.pack_start(inhibitor_box, False, False, 0)
+
+confirm_box.pack_start(message_box, True, True, 0)
+
+# Buttons
+confirm_button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+confirm_button_box.set_border_width(15)
+confirm_button_box.set_homogeneous(True)
+
+cancel_btn = Gtk.Button(label="Cancel")
+cancel_btn.get_style_context().add_class("cancel-button")
+cancel_btn.connect("clicked", lambda *_: show_main_view())
+
+wait_btn = Gtk.Button()
+wait_btn.get_style_context().add_class("cancel-button")
+wait_btn.connect("clicked", lambda *_: wait_for_inhibitors(pending_action))
+wait_btn.set_no_show_all(True)
+
+confirm_btn = Gtk.Button()
+confirm_btn.get_style_context().add_class("confirm-button")
+confirm_btn.connect("clicked", lambda *_: execute_action(pending_action))
+
+confirm_button_box.pack_start(cancel_btn, True, True, 0)
+confirm_button_box.pack_start(wait_btn, True, True, 0)
+confirm_button_box.pack_start(confirm_btn, True, True, 0)
+
+confirm_box.pack_start(confirm_button_box, False, False, 0)
+views.add_named(confirm_box, "confirm")
+
+# Stragglers view: windows that did not close before a logout/reboot
+stragglers_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+
+stragglers_header_label = Gtk.Label()
+stragglers_box.pack_start(make_header(stragglers_header_label), False, False, 0)
+
+stragglers_separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
+stragglers_box.pack_start(stragglers_separator, False, False, 0)
+
+stragglers_message_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+stragglers_message_box.set_border_width(20)
+
+stragglers_label = Gtk.Label()
+stragglers_label.set_line_wrap(True)
+stragglers_label.set_max_width_chars(30)
+stragglers_label.set_justify(Gtk.Justification.CENTER)
+stragglers_message_box.pack_start(stragglers_label, False, False, 0)
+
+# One row per window, filled in by show_stragglers_view()
+stragglers_list = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+stragglers_list.set_border_width(8)
+stragglers_list.get_style_context().add_class("inhibitor-box")
+stragglers_message_box.pack_start(stragglers_list, False, False, 0)
+
+stragglers_box.pack_start(stragglers_message_box, True, True, 0)
+
+stragglers_button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+stragglers_button_box.set_border_width(15)
+stragglers_button_box.set_homogeneous(True)
+
+stragglers_cancel_btn = Gtk.Button(label="Cancel")
+stragglers_cancel_btn.get_style_context().add_class("cancel-button")
+stragglers_cancel_btn.connect("clicked", lambda *_: show_main_view())
+
+force_btn = Gtk.Button()
+force_btn.get_style_context().add_class("confirm-button")
+force_btn.connect("clicked", lambda *_: force_straggler_action())
+
+stragglers_button_box.pack_start(stragglers_cancel_btn, True, True, 0)
+stragglers_button_box.pack_start(force_btn, True, True, 0)
+
+stragglers_box.pack_start(stragglers_button_box, False, False, 0)
+views.add_named(stragglers_box, "stragglers")
+
+def update_inhibitor_list(action):
+    """Show who holds the action up, and whether we are waiting for them"""
+    for child in inhibitor_box.get_children():
+        inhibitor_box.remove(child)
+
+    locks = action_inhibitors(action)
+    blocked = any(lock[3] == 'block' for lock in locks)
+    if locks:
+        title = Gtk.Label()
+        title.set_markup("<small><b>Blocked by</b></small>" if blocked else "<small><b>Delayed by</b></small>")
+        title.set_xalign(0)
+        inhibitor_box.pack_start(title, False, False, 0)
+        for what, who, why, mode, uid, pid in locks:
+            label = Gtk.Label()
+            label.set_markup(
+                f"<small><b>{GLib.markup_escape_text(who)}</b> ({mode}): "
+                f"{GLib.markup_escape_text(why)}</small>"
+            )
+            label.set_xalign(0)
+            label.set_line_wrap(True)
+            label.set_max_width_chars(40)
+            inhibitor_box.pack_start(label, False, False, 0)
+        inhibitor_box.show_all()
+    else:
+        inhibitor_box.hide()
+
+    if waiting_action is action:
+        remaining = max(0, int(wait_deadline - time.monotonic()))
+        wait_btn.set_label(f"Waiting… {remaining}s")
+        wait_btn.set_sensitive(False)
+    else:
+        wait_btn.set_label("Wait")
+        wait_btn.set_sensitive(True)
+    wait_btn.set_visible(blocked or waiting_action is action)
 
-        # Text container
-        text_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
-        text_box.set_hexpand(True)
-
-        # Action label
-        label = Gtk.Label()
-        label.set_markup(f"<b>{action['label']}</b>")
-        label.set_xalign(0)
-
-        # Description
-        desc_label = Gtk.Label()
-        desc_label.set_markup(f"<small>{action['description']}</small>")
-        desc_label.set_xalign(0)
-        desc_label.get_style_context().add_class("action-description")
-
-        text_box.pack_start(label, False, False, 0)
-        text_box.pack_start(desc_label, False, False, 0)
-
-        # Keyboard shortcut hint
-        key_label = Gtk.Label()
-        key_label.set_markup(f"<small><tt>{action['key'].upper()}</tt></small>")
-        key_label.get_style_context().add_class("key-hint")
-
-        button_box.pack_start(icon_label, False, False, 0)
-        button_box.pack_start(text_box, True, True, 0)
-        button_box.pack_start(key_label, False, False, 0)
-
-        # Click handler
-        def on_action_click(widget, event, act=action):
-            if act['confirm']:
-                show_confirm_view(act)
-            else:
-                execute_action(act)
-
-        event_box.connect("button-press-event", on_action_click)
-
-        # Hover effect
-        def on_enter(widget, event):
-            widget.get_style_context().add_class("action-button-hover")
-
-        def on_leave(widget, event):
-            widget.get_style_context().remove_class("action-button-hover")
-
-        event_box.connect("enter-notify-event", on_enter)
-        event_box.connect("leave-notify-event", on_leave)
-
-        actions_box.pack_start(event_box, False, False, 0)
-
-    main_box.pack_start(actions_box, True, True, 0)
+def show_main_view():
+    """Show the main power menu"""
+    global current_view, straggler_action
+    current_view = 'main'
+    straggler_action = None
+    stop_waiting()
 
-    main_container.pack_start(main_box, True, True, 0)
-    main_container.show_all()
+    # Reset hover state to prevent auto-close when switching views
+    popup_common.keep_open(POPUP_NAME)
+    views.set_visible_child_name("main")
 
 def show_confirm_view(action):
     """Show confirmation dialog for destructive actions"""
-    global current_view, pending_action, mouse_entered, close_timeout_id
+    global current_view, pending_action
     current_view = 'confirm'
     pending_action = action
 
     # Reset hover state to prevent auto-close when switching views
-    mouse_entered = True
-    if close_timeout_id is not None:
-        GLib.source_remove(close_timeout_id)
-        close_timeout_id = None
-
-    # Clear container
-    for child in main_container.get_children():
-        main_container.remove(child)
-
-    confirm_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
-
-    # Header
-    header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-    header_box.set_border_width(15)
-
-    header_label = Gtk.Label()
-    header_label.set_xalign(0)
-    header_label.set_markup(f"<b>{action['icon']} Confirm {action['label']}</b>")
-    header_label.set_hexpand(True)
-
-    close_button = Gtk.Button(label="✕")
-    close_button.connect("clicked", lambda *_: Gtk.main_quit())
-    close_button.get_style_context().add_class("close-button")
+    popup_common.keep_open(POPUP_NAME)
 
-    header_box.pack_start(header_label, True, True, 0)
-    header_box.pack_start(close_button, False, False, 0)
-
-    confirm_box.pack_start(header_box, False, False, 0)
-
-    # Add separator
-    separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
-    confirm_box.pack_start(separator, False, False, 0)
-
-    # Confirmation message
-    message_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
-    message_box.set_border_width(30)
-    message_box.set_halign(Gtk.Align.CENTER)
-
-    icon_label = Gtk.Label()
-    icon_label.set_markup(f"<span font='48'>{action['icon']}</span>")
-
-    message_label = Gtk.Label()
+    confirm_header_label.set_markup(f"<b>{action['icon']} Confirm {action['label']}</b>")
+    confirm_icon_label.set_markup(f"<span font='48'>{action['icon']}</span>")
     message_label.set_markup(f"<big>Are you sure you want to <b>{action['label'].lower()}</b>?</big>")
-    message_label.set_line_wrap(True)
-    message_label.set_max_width_chars(30)
-    message_label.set_justify(Gtk.Justification.CENTER)
-
-    message_box.pack_start(icon_label, False, False, 0)
-    message_box.pack_start(message_label, False, False, 10)
-
-    confirm_box.pack_start(message_box, True, True, 0)
-
-    # Buttons
-    button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-    button_box.set_border_width(15)
-    button_box.set_homogeneous(True)
-
-    cancel_btn = Gtk.Button(label="Cancel")
-    cancel_btn.get_style_context().add_class("cancel-button")
-    cancel_btn.connect("clicked", lambda *_: show_main_view())
-
-    confirm_btn = Gtk.Button(label=f"{action['label']} Now")
-    confirm_btn.get_style_context().add_class("confirm-button")
-    confirm_btn.connect("clicked", lambda *_: execute_action(action))
-
-    button_box.pack_start(cancel_btn, True, True, 0)
-    button_box.pack_start(confirm_btn, True, True, 0)
-
-    confirm_box.pack_start(button_box, False, False, 0)
-
-    main_container.pack_start(confirm_box, True, True, 0)
-    main_container.show_all()
-
-# Initialize with main view
-show_main_view()
-win.add(main_container)
+    confirm_btn.set_label(f"{action['label']} Now")
+    update_inhibitor_list(action)
+    views.set_visible_child_name("confirm")
+
+def show_stragglers_view(action, stragglers):
+    """Ask whether to go ahead although some windows did not close"""
+    global current_view, straggler_action
+    current_view = 'stragglers'
+    straggler_action = action
+
+    popup_common.keep_open(POPUP_NAME)
+
+    stragglers_header_label.set_markup(f"<b>{action['icon']} {action['label']}</b>")
+    count = len(stragglers)
+    stragglers_label.set_markup(
+        f"<big>{count} window{'s' if count != 1 else ''} did not close</big>\n"
+        "<small>Unsaved work in them will be lost</small>"
+    )
+    for child in stragglers_list.get_children():
+        stragglers_list.remove(child)
+    for client in stragglers:
+        label = Gtk.Label()
+        label.set_markup(
+            f"<small><b>{GLib.markup_escape_text(client.get('class') or '?')}</b>: "
+            f"{GLib.markup_escape_text(client.get('title') or '')}</small>"
+        )
+        label.set_xalign(0)
+        label.set_ellipsize(3)  # PANGO_ELLIPSIZE_END
+        label.set_max_width_chars(40)
+        stragglers_list.pack_start(label, False, False, 0)
+    stragglers_list.show_all()
+    force_btn.set_label(f"{action['label']} Anyway")
+    views.set_visible_child_name("stragglers")
+
+def force_straggler_action():
+    """Go ahead with the held up action, closing the remaining windows with the session"""
+    global straggler_action
+    action = straggler_action
+    straggler_action = None
+    if action is not None:
+        execute_action(action, kernel_loaded=True, clients_closed=True)
+
+def on_hide():
+    # Closing the menu while windows are still open cancels the action
+    global straggler_action
+    straggler_action = None
+
+win.add(views)
 
 # Style the window
-css_provider = Gtk.CssProvider()
-css_provider.load_from_data(b"""
+popup_common.load_css(win, POPUP_NAME, b"""
 window {
     background-color: rgba(30, 30, 46, 0.95);
     border: 2px solid rgba(137, 180, 250, 0.8);
@@ -373,6 +1025,9 @@ window {
 .action-button-hover {
     background-color: rgba(137, 180, 250, 0.2);
 }
+.action-button:disabled {
+    opacity: 0.4;
+}
 .action-icon {
     font-size: 24px;
 }
@@ -412,6 +1067,11 @@ label {
 .cancel-button:hover {
     background-color: rgba(166, 173, 200, 0.5);
 }
+.inhibitor-box {
+    background-color: rgba(249, 226, 175, 0.1);
+    border: 1px solid rgba(249, 226, 175, 0.3);
+    border-radius: 4px;
+}
 .confirm-button {
     background-color: rgba(243, 139, 168, 0.3);
     border: 1px solid rgba(243, 139, 168, 0.5);
@@ -428,13 +1088,6 @@ separator {
     min-height: 1px;
 }
 """)
-Gtk.StyleContext.add_provider_for_screen(
-    Gdk.Screen.get_default(),
-    css_provider,
-    Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-)
-
-win.show_all()
 
 # Keyboard shortcuts
 def on_key_press(widget, event):
@@ -443,17 +1096,17 @@ def on_key_press(widget, event):
 
     # Escape always closes or goes back
     if key == Gdk.KEY_Escape:
-        if current_view == 'confirm':
+        if current_view in ('confirm', 'stragglers'):
             show_main_view()
         else:
-            Gtk.main_quit()
+            close_popup()
         return True
 
     # In main view, handle action shortcuts
     if current_view == 'main':
         for action in ACTIONS:
-            if keyname == action['key']:
-                if action['confirm']:
+            if keyname == action['key'] and action_rows[action['id']].get_sensitive():
+                if action['confirm'] or action_inhibitors(action, 'block'):
                     show_confirm_view(action)
                 else:
                     execute_action(action)
@@ -464,67 +1117,41 @@ def on_key_press(widget, event):
         if keyname == 'y':
             execute_action(pending_action)
             return True
+        elif keyname == 'w' and wait_btn.get_visible() and wait_btn.get_sensitive():
+            wait_for_inhibitors(pending_action)
+            return True
         elif keyname == 'n':
             show_main_view()
             return True
 
-    return False
-
-win.connect("key-press-event", on_key_press)
-
-# Auto-close after 30 seconds of inactivity
-GLib.timeout_add_seconds(30, Gtk.main_quit)
-
-# Smart click-away-to-close with hover delay
-def schedule_close():
-    """Actually close the window if mouse is still outside"""
-    global mouse_entered
-    if not mouse_entered:
-        Gtk.main_quit()
-    return False  # Don't repeat the timeout
-
-def on_enter_notify(widget, event):
-    global mouse_entered, close_timeout_id
-    # Only track actual window entry, not child widget crossings
-    if event.detail != Gdk.NotifyType.INFERIOR:
-        mouse_entered = True
-        # Cancel any pending close timeout
-        if close_timeout_id is not None:
-            GLib.source_remove(close_timeout_id)
-            close_timeout_id = None
-    return False
+    # With windows still open, Y goes ahead anyway, N/Esc cancels
+    elif current_view == 'stragglers':
+        if keyname == 'y':
+            force_straggler_action()
+            return True
+        elif keyname == 'n':
+            show_main_view()
+            return True
 
-def on_leave_notify(widget, event):
-    global mouse_entered, close_timeout_id
-    # Only track actual window exit, not child widget crossings
-    if event.detail != Gdk.NotifyType.INFERIOR:
-        mouse_entered = False
-        # Schedule close after 1 second of mouse being outside
-        if close_timeout_id is not None:
-            GLib.source_remove(close_timeout_id)
-        close_timeout_id = GLib.timeout_add(1000, schedule_close)
     return False
 
-def on_focus_out(widget, event):
-    global close_timeout_id
-    # Always close on focus loss after a short delay
-    # If focus returns (clicking internal widgets), it will be cancelled
-    if close_timeout_id is not None:
-        GLib.source_remove(close_timeout_id)
-    close_timeout_id = GLib.timeout_add(150, Gtk.main_quit)
-    return False
+win.connect("key-press-event", on_key_press)
 
-def on_focus_in(widget, event):
-    global close_timeout_id
-    # Cancel close if we regain focus (internal button clicks)
-    if close_timeout_id is not None:
-        GLib.source_remove(close_timeout_id)
-        close_timeout_id = None
-    return False
+def on_inhibitors_refreshed():
+    # Reopened while an action waits for its inhibitors: show that wait
+    if waiting_action is not None:
+        show_confirm_view(waiting_action)
+    elif current_view == 'confirm':
+        update_inhibitor_list(pending_action)
 
-win.connect("enter-notify-event", on_enter_notify)
-win.connect("leave-notify-event", on_leave_notify)
-win.connect("focus-out-event", on_focus_out)
-win.connect("focus-in-event", on_focus_in)
+def on_present(args):
+    global current_view
+    # Always open on the main view, with the uptime current
+    uptime_label.set_markup(f"<small>Uptime: <b>{get_uptime()}</b></small>")
+    current_view = 'main'
+    views.set_visible_child_name("main")
+    update_kexec_kernel()
+    update_availability()
+    refresh_inhibitors(on_inhibitors_refreshed)
 
-Gtk.main()
+popup_common.run(POPUP_NAME, win, on_present, on_hide=on_hide)
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
+import popup_client
+
+POPUP_NAME = "waydroid-menu"
+
+# Let a running popup daemon show the menu before paying for GTK startup
+if __name__ == "__main__":
+    popup_client.handoff(POPUP_NAME)
+
 import gi
-import subprocess
-import sys
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk, GLib
+from gi.repository import Gtk, Gdk
 
 try:
     gi.require_version("GtkLayerShell", "0.1")
@@ -13,16 +19,9 @@ try:
 except (ValueError, ImportError):
     HAS_LAYER_SHELL = False
 
-# Check Waydroid session status
-def get_waydroid_status():
-    try:
-        result = subprocess.run(['waydroid', 'status'], capture_output=True, text=True)
-        for line in result.stdout.split('\n'):
-            if 'Session:' in line:
-                return 'RUNNING' in line
-        return False
-    except:
-        return False
+import popup_common
+import waydroid_launcher
+import waydroid_session
 
 # Waydroid actions
 ACTIONS = [
@@ -31,7 +30,7 @@ ACTIONS = [
         'label': 'Start Session',
         'icon': '',
         'key': 's',
-        'command': 'waydroid session start',
+        'argv': ['waydroid', 'session', 'start'],
         'description': 'Start Waydroid container'
     },
     {
@@ -39,7 +38,7 @@ ACTIONS = [
         'label': 'Stop Session',
         'icon': '',
         'key': 'x',
-        'command': 'waydroid session stop',
+        'argv': ['waydroid', 'session', 'stop'],
         'description': 'Stop Waydroid container'
     },
     {
@@ -47,7 +46,7 @@ ACTIONS = [
         'label': 'Show UI',
         'icon': '',
         'key': 'u',
-        'command': 'waydroid show-full-ui',
+        'argv': ['waydroid', 'show-full-ui'],
         'description': 'Show Waydroid window'
     },
     {
@@ -55,15 +54,11 @@ ACTIONS = [
         'label': 'Launch Apps',
         'icon': '',
         'key': 'a',
-        'command': '~/.config/waybar/scripts/waydroid-apps.py',
+        'view': 'apps',
         'description': 'Quick launch Android apps'
     }
 ]
 
-# Global state
-mouse_entered = False
-close_timeout_id = None
-
 # Create main window
 win = Gtk.Window()
 win.set_title("Waydroid Control")
@@ -86,49 +81,129 @@ if HAS_LAYER_SHELL:
 main_container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
 main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
 
+# Set while an action is running; the actions are disabled meanwhile
+busy_action = None
+
+def notify(message, urgency='normal', error=False):
+    popup_common.spawn([
+        'notify-send', '-u', urgency, '-a', 'Waydroid',
+        '-c', 'device.error' if error else 'device',
+        message, '-i', 'waydroid',
+        '-t', '5000' if error else '3000',
+        '-r', '9002' if error else '9001'
+    ])
+
+def finish_action(message, is_running=None, error=False):
+    """End the running action, showing its outcome in the menu and a notification"""
+    global busy_action
+    busy_action = None
+    show_progress(message, done=True, error=error)
+    if is_running is not None:
+        update_header(is_running)
+    notify(message, urgency='critical' if error else 'normal', error=error)
+    popup_common.release()
+
 def execute_action(action):
-    """Execute a Waydroid action"""
-    try:
-        if action['id'] == 'start':
-            # Start in background
-            subprocess.Popen(action['command'], shell=True)
-            subprocess.run(['notify-send', '-u', 'normal', '-a', 'Waydroid', '-c', 'device', 'Android container starting...', '-i', 'waydroid', '-t', '3000', '-r', '9001'])
-        elif action['id'] == 'stop':
-            subprocess.run(action['command'], shell=True, check=True)
-            subprocess.run(['notify-send', '-u', 'normal', '-a', 'Waydroid', '-c', 'device', 'Container stopped successfully', '-i', 'waydroid', '-t', '3000', '-r', '9001'])
-        elif action['id'] == 'show':
-            # Ensure session is running first
-            if not get_waydroid_status():
-                subprocess.run(['notify-send', '-u', 'normal', '-a', 'Waydroid', '-c', 'device', 'Starting container...', '-i', 'waydroid', '-t', '3000', '-r', '9001'])
-                subprocess.Popen('waydroid session start', shell=True)
-                GLib.timeout_add(2000, lambda: subprocess.Popen(action['command'], shell=True))
+    """Run a Waydroid action without blocking the menu"""
+    global busy_action
+    if busy_action is not None:
+        return
+
+    if action['id'] == 'start':
+        busy_action = action
+        popup_common.hold()
+        show_progress("Starting session...")
+
+        def on_started(ready, waited_ms):
+            if ready:
+                finish_action(f"Session running (ready in {waited_ms / 1000:.1f}s)", is_running=True)
+            else:
+                finish_action("Session did not start", error=True)
+
+        waydroid_session.when_ready(on_started)
+    elif action['id'] == 'stop':
+        busy_action = action
+        popup_common.hold()
+        show_progress("Stopping session...")
+
+        def on_stopped(output):
+            if output is None:
+                finish_action("Could not stop the session", error=True)
             else:
-                subprocess.Popen(action['command'], shell=True)
-        else:
-            subprocess.Popen(action['command'], shell=True)
-        Gtk.main_quit()
-    except Exception as e:
-        print(f"Error executing {action['label']}: {e}")
-        subprocess.run(['notify-send', '-u', 'critical', '-a', 'Waydroid', '-c', 'device.error', f'Error: {str(e)}', '-i', 'waydroid', '-t', '5000', '-r', '9002'])
+                finish_action("Container stopped successfully", is_running=False)
+
+        popup_common.run_command(action['argv'], on_stopped)
+    elif action['id'] == 'show':
+        # The UI needs a booted session, start one if needed and wait for it
+        busy_action = action
+        popup_common.hold()
+        show_progress("Waiting for Android...")
+
+        def on_ready(ready, waited_ms):
+            global busy_action
+            if not ready:
+                finish_action("Session did not start", error=True)
+                return
+            if popup_common.spawn(action['argv']) is None:
+                finish_action(f"Error: could not run {action['argv'][0]}", error=True)
+                return
+            busy_action = None
+            popup_common.release()
+            hide_progress()
+            close_popup()
+
+        waydroid_session.when_ready(on_ready, lambda: show_progress("Starting session..."))
+    elif action.get('view') == 'apps':
+        show_view('apps')
+    else:
+        if popup_common.spawn(action['argv']) is None:
+            notify(f"Error: could not run {action['argv'][0]}", urgency='critical', error=True)
+        close_popup()
 
 # Header with close button
 header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
 header_box.set_border_width(15)
 
-# Get status for header
-is_running = get_waydroid_status()
-status_text = "Running" if is_running else "Stopped"
-status_icon = "" if is_running else ""
-
 header_label = Gtk.Label()
 header_label.set_xalign(0)
-header_label.set_markup(f"<span size='large'><b> Waydroid</b></span> <small>({status_text})</small>")
 header_label.set_hexpand(True)
 
+# Last known session state, shared with the launcher view
+session_running = None
+
+def update_header(is_running):
+    """Show the session state in the header"""
+    global session_running
+    session_running = is_running
+    launcher.set_session_running(is_running)
+    if is_running is None:
+        status_text = "checking..."
+    else:
+        status_text = "Running" if is_running else "Stopped"
+    header_label.set_markup(f"<span size='large'><b> Waydroid</b></span> <small>({status_text})</small>")
+
+    # Starting a running session or stopping a stopped one does nothing
+    for action_id, row in action_rows.items():
+        row.set_sensitive(not (
+            (action_id == 'start' and is_running is True) or
+            (action_id == 'stop' and is_running is False)
+        ))
+
+def close_popup(*_):
+    """Close the menu (hidden when hosted by the popup daemon)"""
+    return popup_common.close(POPUP_NAME)
+
 close_button = Gtk.Button(label="✕")
-close_button.connect("clicked", lambda *_: Gtk.main_quit())
+close_button.connect("clicked", close_popup)
 close_button.get_style_context().add_class("close-button")
 
+# Back from the launcher view to the menu
+back_button = Gtk.Button(label="‹")
+back_button.connect("clicked", lambda *_: show_view('menu'))
+back_button.get_style_context().add_class("close-button")
+back_button.set_no_show_all(True)
+
+header_box.pack_start(back_button, False, False, 0)
 header_box.pack_start(header_label, True, True, 0)
 header_box.pack_start(close_button, False, False, 0)
 
@@ -138,9 +213,46 @@ main_box.pack_start(header_box, False, False, 0)
 separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
 main_box.pack_start(separator, False, False, 0)
 
+# Progress and outcome of the running action
+progress_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+progress_box.set_border_width(10)
+progress_box.set_no_show_all(True)
+progress_spinner = Gtk.Spinner()
+progress_label = Gtk.Label()
+progress_label.set_xalign(0)
+progress_label.get_style_context().add_class("progress-text")
+progress_box.pack_start(progress_spinner, False, False, 0)
+progress_box.pack_start(progress_label, True, True, 0)
+menu_view = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+menu_view.pack_start(progress_box, False, False, 0)
+
+def show_progress(message, done=False, error=False):
+    """Show what the menu is doing; actions stay disabled until it is done"""
+    popup_common.keep_open(POPUP_NAME)
+    progress_label.set_text(message)
+    context = progress_label.get_style_context()
+    if error:
+        context.add_class("progress-error")
+    else:
+        context.remove_class("progress-error")
+    progress_spinner.set_visible(not done)
+    if done:
+        progress_spinner.stop()
+    else:
+        progress_spinner.start()
+    progress_box.show()
+    progress_label.show()
+    actions_box.set_sensitive(done)
+
+def hide_progress():
+    progress_spinner.stop()
+    progress_box.hide()
+    actions_box.set_sensitive(True)
+
 # Action buttons
 actions_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
 actions_box.set_border_width(8)
+action_rows = {}  # action id -> row
 
 for action in ACTIONS:
     button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
@@ -201,14 +313,34 @@ for action in ACTIONS:
     event_box.connect("leave-notify-event", on_leave)
 
     actions_box.pack_start(event_box, False, False, 0)
+    action_rows[action['id']] = event_box
+
+menu_view.pack_start(actions_box, True, True, 0)
 
-main_box.pack_start(actions_box, True, True, 0)
+# The menu and the app launcher share the window; switching is a stack flip
+# over an already built launcher and the cached catalogue
+launcher = waydroid_launcher.AppLauncher(POPUP_NAME, close_popup)
+
+views = Gtk.Stack()
+views.set_vhomogeneous(False)
+views.set_interpolate_size(True)
+views.add_named(menu_view, "menu")
+views.add_named(launcher.widget, "apps")
+
+def show_view(name):
+    """Switch between the action menu and the launcher"""
+    popup_common.keep_open(POPUP_NAME)
+    if name == 'apps':
+        launcher.present(session_running)
+    views.set_visible_child_name(name)
+    back_button.set_visible(name == 'apps')
+
+main_box.pack_start(views, True, True, 0)
 main_container.pack_start(main_box, True, True, 0)
 win.add(main_container)
 
 # Style the window
-css_provider = Gtk.CssProvider()
-css_provider.load_from_data(b"""
+popup_common.load_css(win, POPUP_NAME, b"""
 window {
     background-color: rgba(30, 30, 46, 0.95);
     border: 2px solid rgba(137, 180, 250, 0.8);
@@ -227,6 +359,12 @@ window {
 .action-icon {
     font-size: 24px;
 }
+.progress-text {
+    color: #a6adc8;
+}
+.progress-error {
+    color: #f38ba8;
+}
 .action-description {
     color: #a6adc8;
 }
@@ -257,81 +395,58 @@ separator {
     background-color: rgba(137, 180, 250, 0.3);
     min-height: 1px;
 }
-""")
-Gtk.StyleContext.add_provider_for_screen(
-    Gdk.Screen.get_default(),
-    css_provider,
-    Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-)
-
-win.show_all()
+""" + waydroid_launcher.CSS)
 
 # Keyboard shortcuts
 def on_key_press(widget, event):
     key = event.keyval
     keyname = Gdk.keyval_name(key).lower()
 
+    # The launcher view takes typing for its search; Escape steps back out
+    if views.get_visible_child_name() == 'apps':
+        if key == Gdk.KEY_Escape:
+            if not launcher.handle_escape():
+                show_view('menu')
+            return True
+        return False
+
     # Escape closes
     if key == Gdk.KEY_Escape:
-        Gtk.main_quit()
+        close_popup()
         return True
 
     # Handle action shortcuts
     for action in ACTIONS:
         if keyname == action['key']:
-            execute_action(action)
+            if actions_box.get_sensitive() and action_rows[action['id']].get_sensitive():
+                execute_action(action)
             return True
 
     return False
 
 win.connect("key-press-event", on_key_press)
 
-# Auto-close after 30 seconds of inactivity
-GLib.timeout_add_seconds(30, Gtk.main_quit)
-
-# Smart click-away-to-close with hover delay
-def schedule_close():
-    """Actually close the window if mouse is still outside"""
-    global mouse_entered
-    if not mouse_entered:
-        Gtk.main_quit()
-    return False
-
-def on_enter_notify(widget, event):
-    global mouse_entered, close_timeout_id
-    if event.detail != Gdk.NotifyType.INFERIOR:
-        mouse_entered = True
-        if close_timeout_id is not None:
-            GLib.source_remove(close_timeout_id)
-            close_timeout_id = None
-    return False
-
-def on_leave_notify(widget, event):
-    global mouse_entered, close_timeout_id
-    if event.detail != Gdk.NotifyType.INFERIOR:
-        mouse_entered = False
-        if close_timeout_id is not None:
-            GLib.source_remove(close_timeout_id)
-        close_timeout_id = GLib.timeout_add(1000, schedule_close)
-    return False
-
-def on_focus_out(widget, event):
-    global close_timeout_id
-    if close_timeout_id is not None:
-        GLib.source_remove(close_timeout_id)
-    close_timeout_id = GLib.timeout_add(150, Gtk.main_quit)
-    return False
-
-def on_focus_in(widget, event):
-    global close_timeout_id
-    if close_timeout_id is not None:
-        GLib.source_remove(close_timeout_id)
-        close_timeout_id = None
-    return False
-
-win.connect("enter-notify-event", on_enter_notify)
-win.connect("leave-notify-event", on_leave_notify)
-win.connect("focus-out-event", on_focus_out)
-win.connect("focus-in-event", on_focus_in)
-
-Gtk.main()
+def on_present(args):
+    # Draw the menu right away, the session state follows
+    if busy_action is None:
+        hide_progress()
+    views.set_visible_child_name('menu')
+    back_button.hide()
+    update_header(None)
+    start_session_watch()
+
+# The header and actions follow the session while the menu is shown
+session_watch_id = None
+
+def start_session_watch():
+    global session_watch_id
+    if session_watch_id is None:
+        session_watch_id = waydroid_session.watch_session(update_header)
+
+def stop_session_watch():
+    global session_watch_id
+    if session_watch_id is not None:
+        waydroid_session.unwatch_session(session_watch_id)
+        session_watch_id = None
+
+popup_common.run(POPUP_NAME, win, on_present, stop_session_watch)
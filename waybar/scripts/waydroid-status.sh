@@ -6,8 +6,8 @@ ICON=$'\uf17b'  # Android icon (nerd font)
 # Get waydroid status
 WAYDROID_STATUS=$(waydroid status 2>&1 | grep "Session:" | awk '{print $2}')
 
-# Get installed apps count
-APPS_COUNT=$(waydroid app list 2>/dev/null | grep -c "^Name:")
+# Get installed apps count from the cached catalogue (only rebuilt when apps change)
+APPS_COUNT=$("$(dirname "$0")/waydroid_catalogue.py" count 2>/dev/null || echo 0)
 
 if [ "$WAYDROID_STATUS" = "RUNNING" ]; then
     TOOLTIP="Waydroid: Running\n${APPS_COUNT} apps installed\n\nLeft-click: Control menu\nRight-click: Quick launch apps"
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# On-disk catalogue of the installed Waydroid apps.
+# Waydroid writes a waydroid.<package>.desktop entry per installed app, so the
+# catalogue is read from those files instead of asking the container. The
+# parsed list is kept in ~/.cache/waybar together with the mtime of the
+# applications directory and only rebuilt when that moves.
+# Kept free of gi imports so waydroid-status.sh can use it cheaply:
+#   waydroid_catalogue.py count    number of installed apps
+#   waydroid_catalogue.py list     name<TAB>package per app
+# Launches are ranked by frecency: each package keeps one exponentially
+# decaying score, bumped on launch, so ranking never replays a history.
+import configparser
+import glob
+import json
+import os
+import sys
+import time
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "waybar")
+CACHE_FILE = os.path.join(CACHE_DIR, "waydroid-apps.json")
+
+APPLICATIONS_DIR = os.path.join(
+    os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "applications"
+)
+DESKTOP_PREFIX = "waydroid."
+
+LAUNCHES_FILE = os.path.join(
+    os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state"), "waybar", "waydroid-launches.json"
+)
+# A launch counts half as much after this long
+FRECENCY_HALF_LIFE_S = 7 * 24 * 3600
+
+# Named groups of packages launched together: {"name": ["package", ...]}
+# UI state, kept out of ~/.config so sync-from-system.sh doesn't commit it
+GROUPS_FILE = os.path.join(os.path.dirname(LAUNCHES_FILE), "waydroid-groups.json")
+
+# Paths whose mtime changes whenever an app is installed or removed
+WATCHED_PATHS = [APPLICATIONS_DIR]
+
+def data_signature():
+    """mtimes of the watched paths; a different signature means the app set may have changed"""
+    signature = {}
+    for path in WATCHED_PATHS:
+        try:
+            signature[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            pass
+    return signature
+
+def is_app_entry(filename):
+    """Whether a file name is one of Waydroid's per-app desktop entries"""
+    return filename.startswith(DESKTOP_PREFIX) and filename.endswith(".desktop")
+
+def parse_desktop_entry(path):
+    """App dict ({'name', 'package', 'icon'}) from a waydroid.<package>.desktop file, or None"""
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    parser.optionxform = str  # Keys are case sensitive
+    try:
+        parser.read(path, encoding="utf-8")
+        entry = parser["Desktop Entry"]
+    except (configparser.Error, KeyError, UnicodeDecodeError):
+        return None
+    if entry.get("NoDisplay", "false").lower() == "true":
+        return None
+
+    package = os.path.basename(path)[len(DESKTOP_PREFIX):-len(".desktop")]
+    return {
+        'name': entry.get("Name") or package,
+        'package': package,
+        'icon': entry.get("Icon") or None,
+    }
+
+def scan_apps():
+    """Read every Waydroid desktop entry"""
+    apps = []
+    for path in glob.glob(os.path.join(APPLICATIONS_DIR, f"{DESKTOP_PREFIX}*.desktop")):
+        app = parse_desktop_entry(path)
+        if app:
+            apps.append(app)
+    return sorted(apps, key=lambda x: x['name'])
+
+def load_cache():
+    """The cached catalogue ({'signature', 'apps'}), or None"""
+    try:
+        with open(CACHE_FILE) as f:
+            cache = json.load(f)
+        if isinstance(cache.get('apps'), list):
+            return cache
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+def save_apps(apps, signature):
+    """Store a freshly scanned catalogue, tagged with the signature taken before scanning"""
+    tmp_file = f"{CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_file, "w") as f:
+            json.dump({'signature': signature, 'apps': apps}, f)
+        os.replace(tmp_file, CACHE_FILE)
+    except OSError as e:
+        print(f"Error: Could not write {CACHE_FILE}: {e}", file=sys.stderr)
+
+def get_apps():
+    """Installed apps, only re-reading the desktop entries when the directory changed"""
+    signature = data_signature()
+    cache = load_cache()
+    if cache is not None and cache.get('signature') == signature:
+        return cache['apps']
+
+    apps = scan_apps()
+    save_apps(apps, signature)
+    return apps
+
+def load_launches():
+    """package -> [score, time the score was last updated]"""
+    try:
+        with open(LAUNCHES_FILE) as f:
+            launches = json.load(f)
+        if isinstance(launches, dict):
+            return launches
+    except (OSError, ValueError):
+        pass
+    return {}
+
+def decayed_score(launch, now):
+    score, updated = launch
+    return score * 0.5 ** ((now - updated) / FRECENCY_HALF_LIFE_S)
+
+def record_launch(package):
+    """Bump a package's frecency score"""
+    now = time.time()
+    launches = load_launches()
+    launches[package] = [decayed_score(launches.get(package, [0, now]), now) + 1, now]
+
+    tmp_file = f"{LAUNCHES_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(LAUNCHES_FILE), exist_ok=True)
+        with open(tmp_file, "w") as f:
+            json.dump(launches, f)
+        os.replace(tmp_file, LAUNCHES_FILE)
+    except OSError as e:
+        print(f"Error: Could not write {LAUNCHES_FILE}: {e}", file=sys.stderr)
+
+def rank_apps(apps):
+    """Apps ordered by frecency, never launched ones alphabetically after them"""
+    now = time.time()
+    launches = load_launches()
+    scores = {package: decayed_score(launch, now) for package, launch in launches.items()}
+    return sorted(apps, key=lambda app: (-scores.get(app['package'], 0), app['name'].lower()))
+
+def load_groups():
+    """Named app groups, in file order"""
+    try:
+        with open(GROUPS_FILE) as f:
+            groups = json.load(f)
+        if isinstance(groups, dict):
+            return {name: [p for p in packages if isinstance(p, str)] for name, packages in groups.items() if isinstance(packages, list)}
+    except (OSError, ValueError):
+        pass
+    return {}
+
+def save_groups(groups):
+    tmp_file = f"{GROUPS_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(GROUPS_FILE), exist_ok=True)
+        with open(tmp_file, "w") as f:
+            json.dump(groups, f, indent=2)
+        os.replace(tmp_file, GROUPS_FILE)
+    except OSError as e:
+        print(f"Error: Could not write {GROUPS_FILE}: {e}", file=sys.stderr)
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "count"
+    if command == "count":
+        print(len(get_apps()))
+    elif command == "list":
+        for app in get_apps():
+            print(f"{app['name']}\t{app['package']}")
+    else:
+        print("Usage: waydroid_catalogue.py [count|list]")
+        sys.exit(1)
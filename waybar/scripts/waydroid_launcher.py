@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+# Waydroid app launcher view, shared by waydroid-apps.py (as its whole
+# window) and waydroid-menu.py (as its "Launch Apps" view).
+# Apps come from waydroid_catalogue ranked by frecency, are listed through
+# a tree view model so only visible rows are rendered, filtered with an
+# incremental fuzzy search and launched behind one session start.
+import os
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GLib, Gio
+
+import icon_cache
+import popup_common
+import waydroid_catalogue
+import waydroid_session
+
+# Size of the exported Android icons in the list
+ICON_SIZE = 32
+
+# Fallback icons mapping (nerd font icons) for apps without an exported icon
+APP_ICONS = {
+    'Files': '',
+    'Contacts': '',
+    'Gallery': '',
+    'Browser': '',
+    'Music': '',
+    'Calendar': '',
+    'Camera': '',
+    'Settings': '',
+    'Calculator': '',
+    'Clock': '',
+    'Recorder': '',
+}
+
+# Styles for the launcher widgets, appended to the hosting popup's CSS
+CSS = b"""
+.apps-view {
+    background-color: transparent;
+    color: #cdd6f4;
+}
+.apps-view:selected {
+    background-color: rgba(137, 180, 250, 0.2);
+    border-radius: 6px;
+    color: #cdd6f4;
+}
+.search-entry {
+    background-color: rgba(49, 50, 68, 0.8);
+    border: 1px solid rgba(137, 180, 250, 0.3);
+    border-radius: 6px;
+    color: #cdd6f4;
+    padding: 6px;
+}
+.search-entry:focus {
+    border-color: rgba(137, 180, 250, 0.8);
+}
+.group-button, .footer-button {
+    background-color: rgba(137, 180, 250, 0.2);
+    border: 1px solid rgba(137, 180, 250, 0.4);
+    border-radius: 4px;
+    color: #89b4fa;
+    padding: 4px 10px;
+}
+.group-button:hover, .footer-button:hover {
+    background-color: rgba(137, 180, 250, 0.4);
+}
+.info-text {
+    color: #a6adc8;
+}
+"""
+
+def launch_apps(apps):
+    """Launch Waydroid apps back-to-back behind a single session start"""
+    if not apps:
+        return
+    names = ', '.join(app['name'] for app in apps)
+
+    def on_ready(ready, waited_ms):
+        if not ready:
+            popup_common.spawn(['notify-send', '-u', 'critical', '-a', 'Waydroid', '-c', 'device.error', f'Failed to launch {names}: session did not start', '-i', 'waydroid', '-t', '5000', '-r', '9004'])
+            return
+
+        # One launch at a time, each after the previous one was handed over
+        failed = []
+        popup_common.hold()
+
+        def launch_next(queue):
+            if not queue:
+                if failed:
+                    popup_common.spawn(['notify-send', '-u', 'critical', '-a', 'Waydroid', '-c', 'device.error', f"Failed to launch {', '.join(failed)}", '-i', 'waydroid', '-t', '5000', '-r', '9004'])
+                popup_common.release()
+                return
+            app = queue[0]
+            waydroid_session.record_latency(app['package'], waited_ms)
+            waydroid_catalogue.record_launch(app['package'])
+
+            def on_launched(output):
+                if output is None:
+                    failed.append(app['name'])
+                launch_next(queue[1:])
+
+            popup_common.run_command(['waydroid', 'app', 'launch', app['package']], on_launched)
+
+        launch_next(list(apps))
+        started_text = f' (session ready in {waited_ms / 1000:.1f}s)' if waited_ms >= 1000 else ''
+        popup_common.spawn(['notify-send', '-u', 'low', '-a', 'Waydroid', '-c', 'device', f'Opening {names}{started_text}', '-i', 'waydroid', '-t', '2000', '-r', '9003'])
+
+    def on_start():
+        popup_common.spawn(['notify-send', '-u', 'normal', '-a', 'Waydroid', '-c', 'device', f'Starting container to launch {names}...', '-i', 'waydroid', '-t', '3000', '-r', '9003'])
+
+    # Launches requested while the session boots are queued on the same start
+    waydroid_session.when_ready(on_ready, on_start)
+
+def fuzzy_score(query, haystack):
+    """Score query as a subsequence of haystack (higher is better), None if it does not match"""
+    score = 0
+    pos = 0
+    previous = -2
+    for char in query:
+        found = haystack.find(char, pos)
+        if found < 0:
+            return None
+        if found == previous + 1:
+            score += 3  # Consecutive characters
+        if found == 0 or haystack[found - 1] in ' ._-\n':
+            score += 2  # Start of a word
+        score -= min(found - pos, 3)  # Gaps cost a little, capped
+        previous = found
+        pos = found + 1
+    return score
+
+# Follow app installs/uninstalls while running (for the daemon, forever),
+# with one directory watch shared by every launcher in the process
+_launchers = []
+_applications_monitor = None
+_rescan_id = None
+
+def _rescan_catalogue():
+    global _rescan_id
+    _rescan_id = None
+    apps = waydroid_catalogue.scan_apps()
+    waydroid_catalogue.save_apps(apps, waydroid_catalogue.data_signature())
+    for launcher in _launchers:
+        if launcher.widget.get_mapped():
+            launcher.update_apps(waydroid_catalogue.rank_apps(apps))
+    return False
+
+def _on_applications_changed(monitor, file, other_file, event_type):
+    global _rescan_id
+    names = [f.get_basename() for f in (file, other_file) if f is not None]
+    if not any(waydroid_catalogue.is_app_entry(name) for name in names):
+        return
+    # An install touches several files, rescan once they have settled
+    if _rescan_id is not None:
+        GLib.source_remove(_rescan_id)
+    _rescan_id = GLib.timeout_add(250, _rescan_catalogue)
+
+def _watch_catalogue():
+    global _applications_monitor
+    if _applications_monitor is not None:
+        return
+    try:
+        _applications_monitor = Gio.File.new_for_path(waydroid_catalogue.APPLICATIONS_DIR).monitor_directory(
+            Gio.FileMonitorFlags.WATCH_MOVES, None
+        )
+        _applications_monitor.connect("changed", _on_applications_changed)
+    except GLib.Error as e:
+        print(f"Error: Could not watch {waydroid_catalogue.APPLICATIONS_DIR}: {e.message}")
+
+class AppLauncher:
+    """Search, select and launch Waydroid apps; add .widget to a popup window
+
+    on_launch() is called after apps were handed to the session (the host
+    usually closes its popup), on_count(text) with the app count text.
+    """
+
+    def __init__(self, popup_name, on_launch, on_count=None):
+        self.popup_name = popup_name
+        self.on_launch = on_launch
+        self.on_count = on_count
+
+        # Search index: one entry per row with its lowercased name and
+        # package, plus the entries that matched the last query so a
+        # longer query only re-checks those
+        self.search_index = []  # {'app', 'haystack', 'order', 'pixbuf', 'icon_requested'}
+        self.search_query = ""
+        self.search_matches = None
+        self.selected_packages = []  # In selection order, which is also the launch order
+
+        self.widget = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+
+        # Type-to-filter search
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text("Search apps")
+        self.search_entry.get_style_context().add_class("search-entry")
+        self.search_entry.connect("search-changed", self.on_search_changed)
+        self.search_entry.connect("activate", self.on_search_activate)
+        search_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        search_box.set_border_width(8)
+        search_box.pack_start(self.search_entry, False, False, 0)
+        self.widget.pack_start(search_box, False, False, 0)
+
+        # Named app groups, launched together with one click
+        self.groups_box = Gtk.FlowBox()
+        self.groups_box.set_selection_mode(Gtk.SelectionMode.NONE)
+        self.groups_box.set_max_children_per_line(4)
+        self.groups_box.set_border_width(4)
+        self.groups_box.set_no_show_all(True)
+        self.widget.pack_start(self.groups_box, False, False, 0)
+
+        # Session info, only shown while the session is stopped
+        self.info_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        self.widget.pack_start(self.info_box, False, False, 0)
+
+        # Apps list: a tree view over a list model, so only the rows
+        # scrolled into view are ever rendered and no widgets are built per
+        # app. Each model row holds the index of its entry in search_index.
+        self.apps_store = Gtk.ListStore(int)
+
+        self.apps_view = Gtk.TreeView(model=self.apps_store)
+        self.apps_view.set_headers_visible(False)
+        self.apps_view.set_activate_on_single_click(True)
+        self.apps_view.set_hover_selection(True)
+        self.apps_view.set_enable_search(False)  # The search entry does the searching
+        self.apps_view.set_fixed_height_mode(True)  # Row heights are known without measuring every row
+        self.apps_view.get_style_context().add_class("apps-view")
+        self.apps_view.connect("row-activated", self.on_app_activated)
+
+        # Multi-select: clicking the checkbox column toggles an app instead of launching it
+        select_renderer = Gtk.CellRendererToggle()
+        self.select_column = Gtk.TreeViewColumn()
+        self.select_column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        self.select_column.set_fixed_width(32)
+        self.select_column.pack_start(select_renderer, False)
+        self.select_column.set_cell_data_func(select_renderer, self.render_selected)
+        self.apps_view.append_column(self.select_column)
+
+        apps_column = Gtk.TreeViewColumn()
+        apps_column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        apps_column.set_expand(True)
+
+        icon_renderer = Gtk.CellRendererPixbuf()
+        icon_renderer.set_fixed_size(ICON_SIZE + 16, ICON_SIZE + 16)
+        glyph_renderer = Gtk.CellRendererText()
+        glyph_renderer.set_fixed_size(ICON_SIZE + 16, ICON_SIZE + 16)
+        glyph_renderer.set_property("xalign", 0.5)
+        glyph_renderer.set_property("size-points", 18)
+        name_renderer = Gtk.CellRendererText()
+        name_renderer.set_property("weight", 700)
+
+        apps_column.pack_start(icon_renderer, False)
+        apps_column.pack_start(glyph_renderer, False)
+        apps_column.pack_start(name_renderer, True)
+        apps_column.set_cell_data_func(icon_renderer, self.render_icon)
+        apps_column.set_cell_data_func(glyph_renderer, self.render_glyph)
+        apps_column.set_cell_data_func(name_renderer, self.render_name)
+        self.apps_view.append_column(apps_column)
+
+        self.apps_message = Gtk.Label()
+        self.apps_message.set_border_width(20)
+        self.apps_message.get_style_context().add_class("info-text")
+
+        # Loading/empty messages and the list share the space below the search
+        self.apps_stack = Gtk.Stack()
+        self.apps_stack.add_named(self.apps_message, "message")
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scrolled.set_max_content_height(400)
+        scrolled.set_propagate_natural_height(True)
+        scrolled.set_border_width(8)
+        scrolled.add(self.apps_view)
+        self.apps_stack.add_named(scrolled, "list")
+
+        self.widget.pack_start(self.apps_stack, True, True, 0)
+
+        # Shown while apps are selected: launch them or save them as a group
+        self.selection_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        self.selection_box.set_border_width(8)
+        self.selection_box.set_no_show_all(True)
+        self.selection_label = Gtk.Label()
+        self.selection_label.get_style_context().add_class("info-text")
+        self.group_name_entry = Gtk.Entry()
+        self.group_name_entry.set_placeholder_text("Group name")
+        self.group_name_entry.set_width_chars(10)
+        self.group_name_entry.set_hexpand(True)
+        self.group_name_entry.connect("activate", self.on_save_group)
+        save_group_button = Gtk.Button(label="Save")
+        save_group_button.get_style_context().add_class("footer-button")
+        save_group_button.connect("clicked", self.on_save_group)
+        launch_selected_button = Gtk.Button(label="Launch")
+        launch_selected_button.get_style_context().add_class("footer-button")
+        launch_selected_button.connect("clicked", self.on_launch_selected)
+        for widget in (self.selection_label, self.group_name_entry, save_group_button, launch_selected_button):
+            self.selection_box.pack_start(widget, widget is self.group_name_entry, True, 0)
+        self.widget.pack_start(self.selection_box, False, False, 0)
+
+        _launchers.append(self)
+        _watch_catalogue()
+
+    def present(self, is_running=None):
+        """Reset the view and fill it from the catalogue (is_running as far as known)"""
+        self.search_entry.set_text("")
+        self.search_entry.grab_focus()
+        self.selected_packages.clear()
+        self.update_selection()
+        self.set_session_running(is_running)
+
+        # Installed apps come from Waydroid's desktop entries, so this works
+        # without the container and is kept current by the catalogue watch
+        self.update_apps(waydroid_catalogue.rank_apps(waydroid_catalogue.get_apps()))
+        self.update_groups()
+
+    def handle_escape(self):
+        """Escape clears the search first; False when there was nothing to clear"""
+        if self.search_entry.get_text():
+            self.search_entry.set_text("")
+            return True
+        return False
+
+    def set_session_running(self, is_running):
+        """Show the session hint while the session is stopped"""
+        for child in self.info_box.get_children():
+            self.info_box.remove(child)
+
+        if is_running is False:
+            info_inner = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+            info_inner.set_border_width(20)
+            info_label = Gtk.Label()
+            info_label.set_markup("<small>Waydroid session not running.\nApps will start the session automatically.</small>")
+            info_label.set_justify(Gtk.Justification.CENTER)
+            info_label.get_style_context().add_class("info-text")
+            info_inner.pack_start(info_label, False, False, 0)
+            self.info_box.pack_start(info_inner, False, False, 0)
+
+            separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
+            self.info_box.pack_start(separator, False, False, 0)
+
+        self.info_box.show_all()
+
+    def launch(self, apps):
+        launch_apps(apps)
+        self.on_launch()
+
+    def entry_for_iter(self, model, tree_iter):
+        return self.search_index[model.get_value(tree_iter, 0)]
+
+    def render_icon(self, column, renderer, model, tree_iter, data):
+        """Only called for rows being drawn, so icons load as rows scroll into view"""
+        entry = self.entry_for_iter(model, tree_iter)
+        app = entry['app']
+        if entry['pixbuf'] is None and not entry['icon_requested'] and app.get('icon') and os.path.isabs(app['icon']):
+            entry['icon_requested'] = True
+            icon_cache.load_icon(app['icon'], ICON_SIZE, lambda pixbuf, entry=entry: self.show_app_icon(entry, pixbuf))
+        renderer.set_property("pixbuf", entry['pixbuf'])
+        renderer.set_visible(entry['pixbuf'] is not None)
+
+    def render_glyph(self, column, renderer, model, tree_iter, data):
+        # Glyph icon until (or unless) the real one is decoded
+        entry = self.entry_for_iter(model, tree_iter)
+        renderer.set_property("text", APP_ICONS.get(entry['app']['name'], ''))
+        renderer.set_visible(entry['pixbuf'] is None)
+
+    def render_selected(self, column, renderer, model, tree_iter, data):
+        renderer.set_active(self.entry_for_iter(model, tree_iter)['app']['package'] in self.selected_packages)
+
+    def render_name(self, column, renderer, model, tree_iter, data):
+        renderer.set_property("text", self.entry_for_iter(model, tree_iter)['app']['name'])
+
+    def show_app_icon(self, entry, pixbuf):
+        """Keep a decoded icon and redraw the rows that show it"""
+        if pixbuf is None or not any(e is entry for e in self.search_index):
+            return
+        entry['pixbuf'] = pixbuf
+        self.apps_view.queue_draw()
+
+    def app_for_package(self, package):
+        """The catalogue entry for a package, or a stand-in if it is not installed"""
+        for entry in self.search_index:
+            if entry['app']['package'] == package:
+                return entry['app']
+        return {'package': package, 'name': package}
+
+    def update_selection(self):
+        """Show the selection bar while apps are selected"""
+        count = len(self.selected_packages)
+        self.selection_label.set_text(f"{count} selected")
+        self.selection_box.set_visible(count > 0)
+        if count:
+            self.selection_box.show_all()
+        self.apps_view.queue_draw()
+
+    def on_app_activated(self, view, path, column):
+        app = self.entry_for_iter(self.apps_store, self.apps_store.get_iter(path))['app']
+        if column is self.select_column:
+            popup_common.keep_open(self.popup_name)
+            if app['package'] in self.selected_packages:
+                self.selected_packages.remove(app['package'])
+            else:
+                self.selected_packages.append(app['package'])
+            self.update_selection()
+        else:
+            self.launch([app])
+
+    def on_launch_selected(self, *_):
+        apps = [self.app_for_package(package) for package in self.selected_packages]
+        self.selected_packages.clear()
+        self.launch(apps)
+
+    def on_save_group(self, *_):
+        name = self.group_name_entry.get_text().strip()
+        if not name or not self.selected_packages:
+            return
+        groups = waydroid_catalogue.load_groups()
+        groups[name] = list(self.selected_packages)
+        waydroid_catalogue.save_groups(groups)
+        self.group_name_entry.set_text("")
+        self.selected_packages.clear()
+        self.update_selection()
+        self.update_groups()
+
+    def update_groups(self):
+        """One button per saved group; right-click removes a group"""
+        for child in self.groups_box.get_children():
+            self.groups_box.remove(child)
+        groups = waydroid_catalogue.load_groups()
+
+        def on_group_press(button, event, name):
+            if event.button == 3:
+                groups.pop(name, None)
+                waydroid_catalogue.save_groups(groups)
+                self.update_groups()
+                return True
+            return False
+
+        for name, packages in groups.items():
+            button = Gtk.Button(label=f"{name} ({len(packages)})")
+            button.set_tooltip_text(', '.join(self.app_for_package(p)['name'] for p in packages))
+            button.get_style_context().add_class("group-button")
+            button.connect("clicked", lambda _, packages=packages: self.launch([self.app_for_package(p) for p in packages]))
+            button.connect("button-press-event", on_group_press, name)
+            self.groups_box.add(button)
+
+        self.groups_box.set_visible(bool(groups))
+        if groups:
+            self.groups_box.show_all()
+
+    def apply_search(self, text):
+        """Show the rows matching the search text, best matches first"""
+        query = text.lower().replace(' ', '')
+
+        # Narrow from the previous matches when the query only grew
+        if self.search_matches is not None and query.startswith(self.search_query):
+            candidates = self.search_matches
+        else:
+            candidates = self.search_index
+
+        if query:
+            scored = []
+            for entry in candidates:
+                score = fuzzy_score(query, entry['haystack'])
+                if score is not None:
+                    scored.append((-score, entry['order'], entry))
+            scored.sort(key=lambda item: item[:2])
+            matches = [entry for _, _, entry in scored]
+        else:
+            matches = self.search_index
+
+        # Refill the model detached from the view, so it lays out once
+        self.apps_view.set_model(None)
+        self.apps_store.clear()
+        for entry in matches:
+            self.apps_store.append([entry['order']])
+        self.apps_view.set_model(self.apps_store)
+
+        self.search_query = query
+        self.search_matches = matches
+
+    def on_search_changed(self, entry):
+        self.apply_search(entry.get_text())
+
+    def on_search_activate(self, entry):
+        # Enter launches the best match
+        if self.search_matches:
+            self.launch([self.search_matches[0]['app']])
+
+    def update_apps(self, apps):
+        """Fill the app list (apps is None while loading)"""
+        if self.on_count:
+            self.on_count("loading..." if apps is None else f"{len(apps)} apps")
+
+        self.search_index.clear()
+        self.search_matches = None
+        for app in apps or []:
+            self.search_index.append({
+                'app': app,
+                'haystack': f"{app['name'].lower()}\n{app['package'].lower()}",
+                'order': len(self.search_index),
+                'pixbuf': None,
+                'icon_requested': False,
+            })
+
+        if apps is None:
+            self.apps_message.set_markup("<small>Loading apps...</small>")
+            self.apps_stack.set_visible_child_name("message")
+        elif not apps:
+            self.apps_message.set_markup("<small>No apps installed</small>")
+            self.apps_stack.set_visible_child_name("message")
+        else:
+            self.apps_stack.set_visible_child_name("list")
+        self.apply_search(self.search_entry.get_text())
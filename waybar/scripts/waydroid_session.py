@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# Waydroid session readiness for the waydroid popups.
+# Work that needs Android (launching an app, showing the UI) is queued with
+# when_ready(); the session is started if needed and the queue runs as soon
+# as the session is RUNNING and Android reports sys.boot_completed, instead
+# of after a fixed delay.
+# The session state is read from the Waydroid container service on the
+# system bus (id.waydro.Container GetSession); the service not being on the
+# bus means there is no session. `waydroid status` is only parsed when the
+# bus itself can't be used.
+import os
+import time
+
+from gi.repository import GLib, Gio
+
+import popup_common
+
+POLL_INTERVAL_MS = 500
+START_TIMEOUT_S = 120
+
+LATENCY_LOG = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "waybar", "waydroid-launch.log"
+)
+LATENCY_LOG_LINES = 200
+
+# Callbacks waiting for the session, and when the wait started
+_waiting = []
+_started_at = None
+
+# Whether this wait had to start the session, and who wants to know
+_session_starting = False
+_start_notices = []
+
+CONTAINER_BUS_NAME = "id.waydro.Container"
+CONTAINER_OBJECT_PATH = "/ContainerManager"
+CONTAINER_INTERFACE = "id.waydro.ContainerManager"
+WATCH_INTERVAL_MS = 2000
+
+# Session watchers: id -> {'callback', 'state', 'source_id'}
+_watchers = {}
+_next_watcher_id = 1
+
+# Check if the session is running from `waydroid status` output
+def parse_waydroid_status(output):
+    for line in (output or '').split('\n'):
+        if 'Session:' in line:
+            return 'RUNNING' in line
+    return False
+
+def get_session_running(callback):
+    """callback(is_running) with the container's session state, without spawning if possible"""
+    def fallback():
+        popup_common.run_command(['waydroid', 'status'], lambda output: callback(parse_waydroid_status(output)))
+
+    def on_reply(connection, result):
+        try:
+            session, = connection.call_finish(result).unpack()
+        except GLib.Error as e:
+            if (e.matches(Gio.dbus_error_quark(), Gio.DBusError.SERVICE_UNKNOWN)
+                    or e.matches(Gio.dbus_error_quark(), Gio.DBusError.NAME_HAS_NO_OWNER)):
+                # No container service, so no session either
+                callback(False)
+            else:
+                fallback()
+            return
+        # An empty dict means no session; otherwise 'state' is the LXC state,
+        # FROZEN while Waydroid has suspended an idle session
+        callback(session.get('state') in ('RUNNING', 'FROZEN'))
+
+    def on_bus(source, result):
+        try:
+            connection = Gio.bus_get_finish(result)
+        except GLib.Error:
+            fallback()
+            return
+        connection.call(
+            CONTAINER_BUS_NAME, CONTAINER_OBJECT_PATH, CONTAINER_INTERFACE, "GetSession",
+            None, GLib.VariantType.new("(a{ss})"), Gio.DBusCallFlags.NO_AUTO_START,
+            1000, None, on_reply
+        )
+
+    Gio.bus_get(Gio.BusType.SYSTEM, None, on_bus)
+
+def watch_session(callback):
+    """Call callback(is_running) now and whenever the session state changes; returns a watch id
+
+    The container service has no change signal, so this polls GetSession
+    (a D-Bus call, not a process) and only reports changes.
+    """
+    global _next_watcher_id
+    watch_id = _next_watcher_id
+    _next_watcher_id += 1
+    watcher = {'callback': callback, 'state': None, 'source_id': None}
+    _watchers[watch_id] = watcher
+
+    def on_state(is_running):
+        if _watchers.get(watch_id) is not watcher:
+            return  # Unwatched meanwhile
+        if is_running != watcher['state']:
+            watcher['state'] = is_running
+            callback(is_running)
+        watcher['source_id'] = GLib.timeout_add(WATCH_INTERVAL_MS, poll)
+
+    def poll():
+        watcher['source_id'] = None
+        get_session_running(on_state)
+        return False
+
+    poll()
+    return watch_id
+
+def unwatch_session(watch_id):
+    watcher = _watchers.pop(watch_id, None)
+    if watcher and watcher['source_id'] is not None:
+        GLib.source_remove(watcher['source_id'])
+
+def check_ready(callback):
+    """callback(ready): session RUNNING and Android done booting"""
+    def on_running(is_running):
+        if not is_running:
+            callback(False)
+            return
+        popup_common.run_command(
+            ['waydroid', 'prop', 'get', 'sys.boot_completed'],
+            lambda output: callback((output or '').strip() == '1')
+        )
+
+    get_session_running(on_running)
+
+def _finish(ready):
+    """Run everything that was waiting, with how long it waited"""
+    global _started_at, _session_starting
+    waited_ms = int((time.monotonic() - _started_at) * 1000)
+    waiting = _waiting[:]
+    _waiting.clear()
+    _start_notices.clear()
+    _started_at = None
+    _session_starting = False
+
+    for callback in waiting:
+        try:
+            callback(ready, waited_ms)
+        finally:
+            popup_common.release()
+
+def _poll():
+    def on_checked(ready):
+        if ready:
+            _finish(True)
+        elif time.monotonic() - _started_at > START_TIMEOUT_S:
+            _finish(False)
+        else:
+            GLib.timeout_add(POLL_INTERVAL_MS, _poll)
+
+    check_ready(on_checked)
+    return False  # Re-armed by on_checked once the check completes
+
+def when_ready(callback, on_start=None):
+    """Call callback(ready, waited_ms) once the session can take requests
+
+    Starts the session if it is not running, calling on_start() if the
+    request has to wait for that. Requests made while a start is in progress
+    join the same queue, so there is only ever one start. The process is
+    kept alive until the callback has run.
+    """
+    global _started_at
+    popup_common.hold()
+    _waiting.append(callback)
+    if on_start:
+        if _session_starting:
+            on_start()
+        else:
+            _start_notices.append(on_start)
+    if _started_at is not None:
+        return  # Already waiting, the callback runs with the rest
+    _started_at = time.monotonic()
+
+    def on_checked(ready):
+        global _session_starting
+        if ready:
+            _finish(True)
+            return
+        _session_starting = True
+        for notice in _start_notices:
+            notice()
+        _start_notices.clear()
+        # `waydroid session start` stays in the foreground for the session's lifetime
+        if popup_common.spawn(['waydroid', 'session', 'start']) is None:
+            _finish(False)
+            return
+        _poll()
+
+    check_ready(on_checked)
+
+def record_latency(package, waited_ms):
+    """Append a start-to-launch latency to the log, keeping its last lines"""
+    try:
+        with open(LATENCY_LOG) as f:
+            lines = f.readlines()[-(LATENCY_LOG_LINES - 1):]
+    except OSError:
+        lines = []
+    lines.append(f"{time.strftime('%Y-%m-%dT%H:%M:%S')}\t{package}\t{waited_ms}\n")
+    try:
+        os.makedirs(os.path.dirname(LATENCY_LOG), exist_ok=True)
+        with open(LATENCY_LOG, "w") as f:
+            f.writelines(lines)
+    except OSError as e:
+        print(f"Error: Could not write {LATENCY_LOG}: {e}")
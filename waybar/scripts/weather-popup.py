@@ -1,4 +1,12 @@
 #!/usr/bin/env python3
+import popup_client
+
+POPUP_NAME = "weather-popup"
+
+# Let a running popup daemon show the forecast before paying for GTK startup
+if __name__ == "__main__":
+    popup_client.handoff(POPUP_NAME)
+
 import gi
 import subprocess
 import threading
@@ -124,6 +132,8 @@ try:
 except (ValueError, ImportError):
     HAS_LAYER_SHELL = False
 
+import popup_common
+
 # Configuration
 CITY = "Sao_Carlos"
 
@@ -136,8 +146,6 @@ VIEW_MODES = [
 ]
 
 # Global state
-mouse_entered = False
-close_timeout_id = None
 current_view_idx = 0
 
 # Create main window
@@ -271,8 +279,12 @@ header_label.set_xalign(0)
 header_label.set_markup(f"<span size='large'><b> Weather: {CITY.replace('_', ' ')}</b></span>")
 header_label.set_hexpand(True)
 
+def close_popup(*_):
+    """Close the popup (hidden when hosted by the popup daemon)"""
+    return popup_common.close(POPUP_NAME)
+
 close_button = Gtk.Button(label="✕")
-close_button.connect("clicked", lambda *_: Gtk.main_quit())
+close_button.connect("clicked", close_popup)
 close_button.get_style_context().add_class("close-button")
 
 header_box.pack_start(header_label, True, True, 0)
@@ -330,8 +342,7 @@ main_container.pack_start(footer_box, False, False, 0)
 win.add(main_container)
 
 # Style the window
-css_provider = Gtk.CssProvider()
-css_provider.load_from_data(b"""
+popup_common.load_css(win, POPUP_NAME, b"""
 window {
     background-color: rgba(30, 30, 46, 0.95);
     border: 2px solid rgba(137, 180, 250, 0.8);
@@ -396,16 +407,6 @@ separator {
     min-height: 1px;
 }
 """)
-Gtk.StyleContext.add_provider_for_screen(
-    Gdk.Screen.get_default(),
-    css_provider,
-    Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-)
-
-win.show_all()
-
-# Initial weather fetch
-refresh_weather()
 
 # Keyboard shortcuts
 def on_key_press(widget, event):
@@ -413,7 +414,7 @@ def on_key_press(widget, event):
     keyname = Gdk.keyval_name(key).lower() if Gdk.keyval_name(key) else ""
 
     if key == Gdk.KEY_Escape:
-        Gtk.main_quit()
+        close_popup()
         return True
     elif keyname == 'r':
         refresh_weather()
@@ -434,51 +435,9 @@ def on_key_press(widget, event):
 
 win.connect("key-press-event", on_key_press)
 
-# Auto-close after 90 seconds (longer for weather reading)
-GLib.timeout_add_seconds(90, Gtk.main_quit)
-
-# Smart click-away-to-close with hover delay
-def schedule_close():
-    global mouse_entered
-    if not mouse_entered:
-        Gtk.main_quit()
-    return False
-
-def on_enter_notify(widget, event):
-    global mouse_entered, close_timeout_id
-    if event.detail != Gdk.NotifyType.INFERIOR:
-        mouse_entered = True
-        if close_timeout_id is not None:
-            GLib.source_remove(close_timeout_id)
-            close_timeout_id = None
-    return False
-
-def on_leave_notify(widget, event):
-    global mouse_entered, close_timeout_id
-    if event.detail != Gdk.NotifyType.INFERIOR:
-        mouse_entered = False
-        if close_timeout_id is not None:
-            GLib.source_remove(close_timeout_id)
-        close_timeout_id = GLib.timeout_add(1000, schedule_close)
-    return False
-
-def on_focus_out(widget, event):
-    global close_timeout_id
-    if close_timeout_id is not None:
-        GLib.source_remove(close_timeout_id)
-    close_timeout_id = GLib.timeout_add(150, Gtk.main_quit)
-    return False
-
-def on_focus_in(widget, event):
-    global close_timeout_id
-    if close_timeout_id is not None:
-        GLib.source_remove(close_timeout_id)
-        close_timeout_id = None
-    return False
-
-win.connect("enter-notify-event", on_enter_notify)
-win.connect("leave-notify-event", on_leave_notify)
-win.connect("focus-out-event", on_focus_out)
-win.connect("focus-in-event", on_focus_in)
+def on_present(args):
+    # Fetch fresh weather every time the popup is shown
+    refresh_weather()
 
-Gtk.main()
+# Auto-close after 90 seconds (longer for weather reading)
+popup_common.run(POPUP_NAME, win, on_present, timeout=90)